@@ -2,20 +2,38 @@
 import asyncio
 from datetime import timedelta
 import logging
+import time
 
+from aiohttp import ClientError
 from async_timeout import timeout
-from custom_components.airtouch3.vzduch import Vzduch
+from custom_components.airtouch3.vzduch import Vzduch, AC_POWER_OFF, MIN_TIME_BETWEEN_UPDATES, NO_CHANGES
 import voluptuous as vol
 
 from homeassistant.config_entries import SOURCE_IMPORT, ConfigEntry
 from homeassistant.const import CONF_HOST, CONF_PORT, CONF_TIMEOUT
-from .const import DOMAIN, TIMEOUT
+from homeassistant.core import callback
+from .const import (
+    CONF_LOG_PAYLOADS,
+    CONF_POLL_CEILING,
+    CONF_POLL_FLOOR,
+    DEFAULT_POLL_CEILING,
+    DEFAULT_POLL_FLOOR,
+    DOMAIN,
+    EVENT_COMMAND_REJECTED,
+    FAST_POLL_WINDOW,
+    POLL_BACKOFF_FACTOR,
+    STATE_SAVE_DELAY,
+    STATE_STORAGE_VERSION,
+    TIMEOUT,
+)
 from homeassistant.exceptions import ConfigEntryNotReady
 import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.typing import HomeAssistantType
-from homeassistant.util import Throttle
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 
 from . import config_flow  # noqa: F401
+from .scenes import AirTouch3Scenes
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -45,20 +63,32 @@ async def async_setup_entry(hass: HomeAssistantType, entry: ConfigEntry):
     """Connect to Airtouch3 Unit"""
     conf = entry.data
 
-    vzduch_api = await api_init(
+    coordinator = await api_init(
         hass,
         conf[CONF_HOST],
         conf.get(CONF_PORT),
+        poll_floor=entry.options.get(CONF_POLL_FLOOR, DEFAULT_POLL_FLOOR),
+        poll_ceiling=entry.options.get(CONF_POLL_CEILING, DEFAULT_POLL_CEILING),
+        log_payloads=entry.options.get(CONF_LOG_PAYLOADS, False),
     )
-    if not vzduch_api:
+    if not coordinator:
         return False
-    hass.data.setdefault(DOMAIN, {}).update({entry.entry_id: vzduch_api})
+    hass.data.setdefault(DOMAIN, {}).update({entry.entry_id: coordinator})
+    entry.async_on_unload(entry.add_update_listener(async_update_options))
     for component in COMPONENT_TYPES:
         hass.async_create_task(
             hass.config_entries.async_forward_entry_setup(entry, component)
         )
     return True
 
+async def async_update_options(hass, config_entry):
+    """Apply changed options to the running coordinator."""
+    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    coordinator.set_poll_limits(
+        config_entry.options.get(CONF_POLL_FLOOR, DEFAULT_POLL_FLOOR),
+        config_entry.options.get(CONF_POLL_CEILING, DEFAULT_POLL_CEILING))
+    coordinator.api.log_payloads = config_entry.options.get(CONF_LOG_PAYLOADS, False)
+
 async def async_unload_entry(hass, config_entry):
     """Unload a config entry."""
     await asyncio.wait(
@@ -67,27 +97,222 @@ async def async_unload_entry(hass, config_entry):
             for component in COMPONENT_TYPES
         ]
     )
-    hass.data[DOMAIN].pop(config_entry.entry_id)
+    coordinator = hass.data[DOMAIN].pop(config_entry.entry_id)
+    await coordinator.api.close()
     if not hass.data[DOMAIN]:
         hass.data.pop(DOMAIN)
     return True
 
-async def api_init(hass, host, port, timeout = TIMEOUT):
+async def api_init(hass, host, port, timeout = TIMEOUT, poll_floor = DEFAULT_POLL_FLOOR, poll_ceiling = DEFAULT_POLL_CEILING,
+                   log_payloads = False):
     """Init the Airtouch unit."""
 
-    session = hass.helpers.aiohttp_client.async_get_clientsession()
+    _LOGGER.debug(f"We have host {host} port {port}")
+    device = Vzduch(None, host, port, timeout, log_payloads=log_payloads)
     try:
-        _LOGGER.debug(f"We have host {host} port {port}")
-        device = Vzduch(session, host, port, timeout)
-        await device.async_update()
-    except asyncio.TimeoutError:
-        _LOGGER.debug("Connection to %s timed out", host)
-        raise ConfigEntryNotReady
-    except ClientConnectionError:
-        _LOGGER.debug("ClientConnectionError to %s", host)
-        raise ConfigEntryNotReady
+        coordinator = AirTouch3Coordinator(hass, device, AdaptivePollInterval(poll_floor, poll_ceiling))
+        if await coordinator.async_load_state():
+            # Entities are created from the saved state while the unit is read in the background
+            _LOGGER.debug(f"Starting {host} from saved state")
+            hass.async_create_task(coordinator.async_refresh())
+            return coordinator
+        await coordinator.async_refresh()
     except Exception:  # pylint: disable=broad-except
         _LOGGER.error("Unexpected error creating device %s", host)
+        await device.close()
         return None
 
-    return device
\ No newline at end of file
+    if not coordinator.last_update_success:
+        _LOGGER.debug("Initial update of %s failed", host)
+        await device.close()
+        raise ConfigEntryNotReady
+
+    return coordinator
+
+class AdaptivePollInterval:
+    """Chooses the seconds until the next poll.
+
+    For FAST_POLL_WINDOW seconds after a command the floor is used, so the unit's response
+    shows up quickly. While every aircon is off and a poll brings no changes the interval
+    grows step by step up to the ceiling. Any other poll returns to the base interval."""
+
+    def __init__(self, floor, ceiling, base = MIN_TIME_BETWEEN_UPDATES.total_seconds()):
+        """Initialize"""
+        self._preferred_base = base
+        self._interval = base
+        self._last_command = None
+        self.set_limits(floor, ceiling)
+
+    def set_limits(self, floor, ceiling):
+        """Change the floor and ceiling, keeping base and the current interval within them"""
+        self._floor = floor
+        self._ceiling = max(floor, ceiling)
+        self._base = min(self._ceiling, max(self._floor, self._preferred_base))
+        self._interval = min(self._ceiling, max(self._floor, self._interval))
+
+    def command_sent(self):
+        """Start the fast window and return the floor"""
+        self._last_command = time.monotonic()
+        self._interval = self._floor
+        return self._interval
+
+    def next_interval(self, idle, changed):
+        """Return the interval after a poll. idle is True when every aircon is off,
+        changed is True when the poll changed any state"""
+        if self._last_command is not None and time.monotonic() - self._last_command < FAST_POLL_WINDOW:
+            self._interval = self._floor
+        elif idle and not changed:
+            self._interval = min(self._ceiling, max(self._base, self._interval * POLL_BACKOFF_FACTOR))
+        else:
+            self._interval = self._base
+        return self._interval
+
+    @property
+    def interval(self):
+        """Return the current interval in seconds"""
+        return self._interval
+
+class AirTouch3Coordinator(DataUpdateCoordinator):
+    """Polls a Vzduch unit once per cycle and pushes the result to all entities.
+
+    The coordinator data is the VzduchChanges collected since the previous push,
+    so entities can skip writing state when their slice of the data did not change.
+    The update interval is chosen by an AdaptivePollInterval after every poll and command."""
+
+    def __init__(self, hass, api, poll_interval = None):
+        """Initialize"""
+        if poll_interval is None:
+            poll_interval = AdaptivePollInterval(DEFAULT_POLL_FLOOR, DEFAULT_POLL_CEILING)
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"{DOMAIN} {api.host}",
+            update_interval=timedelta(seconds=poll_interval.interval),
+        )
+        self.api = api
+        self.scenes = AirTouch3Scenes(hass, api.host)
+        self._state_store = Store(hass, STATE_STORAGE_VERSION, f"{DOMAIN}.state.{api.host}")
+        self._saved_response = None
+        self._poll_interval = poll_interval
+        self.api.on_state_changed = self.async_push_update
+        self.api.on_command_rejected = self.async_command_rejected
+        self._fetch_count = 0
+        self._fetch_failures = 0
+        self._last_fetch_latency = None
+        self._total_fetch_latency = 0.0
+
+    async def _async_update_data(self):
+        """Do exactly one fetch of the unit state for this cycle."""
+        start = time.monotonic()
+        try:
+            await self.api.async_update()
+        except (asyncio.TimeoutError, ClientError) as error:
+            self._fetch_failures += 1
+            self.data = NO_CHANGES
+            self._set_interval(self._poll_interval.next_interval(False, False))
+            raise UpdateFailed(f"Error communicating with {self.api.host}: {error}") from error
+        finally:
+            self._fetch_count += 1
+            self._last_fetch_latency = time.monotonic() - start
+            self._total_fetch_latency += self._last_fetch_latency
+
+        _LOGGER.debug(f"[AT3Coordinator] Fetch {self._fetch_count} took {self._last_fetch_latency:.3f}s")
+        if not self.api.available:
+            self._fetch_failures += 1
+            self.data = NO_CHANGES
+            self._set_interval(self._poll_interval.next_interval(False, False))
+            raise UpdateFailed(f"No valid response from {self.api.host}")
+        self._async_save_state()
+        changes = self.api.pop_changes()
+        idle = all(aircon.power == AC_POWER_OFF for aircon in self.api.aircons)
+        self._set_interval(self._poll_interval.next_interval(idle, any(changes)))
+        return changes
+
+    async def async_load_state(self):
+        """Restore the state saved by an earlier run. Returns True if there was one."""
+        saved = await self._state_store.async_load()
+        if not saved or not self.api.restore_state(saved["response"]):
+            return False
+        self._saved_response = self.api.last_response
+        return True
+
+    @callback
+    def _async_save_state(self):
+        """Save the last parsed response, a little later so bursts of changes are written once."""
+        response = self.api.last_response
+        if response is None or response is self._saved_response:
+            return
+        self._saved_response = response
+        self._state_store.async_delay_save(lambda: {"response": response}, STATE_SAVE_DELAY)
+
+    def _set_interval(self, seconds):
+        """Use seconds as the interval for the next scheduled poll."""
+        if self.update_interval.total_seconds() != seconds:
+            _LOGGER.debug(f"[AT3Coordinator] Polling {self.api.host} every {seconds}s")
+        self.update_interval = timedelta(seconds=seconds)
+
+    def set_poll_limits(self, floor, ceiling):
+        """Change the poll interval floor and ceiling."""
+        self._poll_interval.set_limits(floor, ceiling)
+        self._set_interval(self._poll_interval.interval)
+
+    @callback
+    def async_push_update(self):
+        """Notify entities of state changed outside of the polling cycle (commands and their replies).
+        Polls at the floor for a while, so the unit's response to the command shows up quickly."""
+        self._set_interval(self._poll_interval.command_sent())
+        self.async_set_updated_data(self.api.pop_changes())
+
+    @callback
+    def async_command_rejected(self, ac_id, field, zone_id, expected, actual):
+        """Fire an event for a command the server did not confirm."""
+        self.hass.bus.async_fire(EVENT_COMMAND_REJECTED, {
+            "host": self.api.host,
+            "aircon_id": ac_id,
+            "field": field,
+            "zone_id": zone_id,
+            "expected": expected,
+            "actual": actual,
+        })
+
+    @property
+    def fetch_count(self):
+        """Return the number of fetches made against the unit."""
+        return self._fetch_count
+
+    @property
+    def fetch_failures(self):
+        """Return the number of fetches that did not return valid data."""
+        return self._fetch_failures
+
+    @property
+    def last_fetch_latency(self):
+        """Return the duration in seconds of the last fetch."""
+        return self._last_fetch_latency
+
+    @property
+    def average_fetch_latency(self):
+        """Return the mean duration in seconds of all fetches."""
+        if self._fetch_count == 0:
+            return None
+        return self._total_fetch_latency / self._fetch_count
+
+    @property
+    def poll_interval(self):
+        """Return the seconds until the next scheduled poll."""
+        return self._poll_interval.interval
+
+    @property
+    def stats(self):
+        """Return the fetch and command statistics as state attributes."""
+        return {
+            "stale": self.api.stale,
+            "poll_interval": self.poll_interval,
+            "fetch_count": self.fetch_count,
+            "fetch_failures": self.fetch_failures,
+            "last_fetch_latency": None if self.last_fetch_latency is None else round(self.last_fetch_latency, 3),
+            "average_fetch_latency": None if self.average_fetch_latency is None else round(self.average_fetch_latency, 3),
+            **self.api.parse_stats,
+            **self.api.request_stats,
+            **self.api.commands.stats,
+        }
\ No newline at end of file
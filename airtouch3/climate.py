@@ -1,4 +1,5 @@
 """Support for the Airthouch 3 Unit."""
+import asyncio
 import logging
 
 import voluptuous as vol
@@ -21,7 +22,8 @@ from homeassistant.components.climate.const import (
     SUPPORT_FAN_MODE,
     SUPPORT_TARGET_TEMPERATURE,
 )
-from homeassistant.const import ATTR_TEMPERATURE, CONF_HOST, CONF_NAME, TEMP_CELSIUS
+from homeassistant.const import ATTR_ENTITY_ID, ATTR_TEMPERATURE, CONF_HOST, CONF_NAME, TEMP_CELSIUS
+from homeassistant.helpers import entity_registry
 import homeassistant.helpers.config_validation as cv
 
 from custom_components.airtouch3.vzduch import (
@@ -37,10 +39,13 @@ from custom_components.airtouch3.vzduch import (
     AC_MODE_COOL,
     AC_MODE_FAN,
     AC_MODE_DRY,
-    AC_MODE_AUTO
+    AC_MODE_AUTO,
+    ZONE_ON,
+    ZONE_OFF,
 )
 
 from . import DOMAIN as AT3_DOMAIN
+from .entity import AirTouch3Entity
 from .const import (
     ATTR_INSIDE_TEMPERATURE,
     FAN_QUIET,
@@ -107,11 +112,55 @@ SUPPORTED_FEATURES = \
 
 CLIMATE_ICON = "mdi:home-variant-outline"
 
+ATTR_SCENE_NAME = "name"
+ATTR_ZONES = "zones"
+ATTR_STATE = "state"
+ATTR_DAMPER = "damper"
+
+SCENE_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_SCENE_NAME): cv.string,
+        vol.Optional(ATTR_ENTITY_ID): cv.entity_ids,
+    }
+)
+
+SET_ZONES_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_ZONES): vol.All(
+            cv.ensure_list,
+            [
+                vol.Schema(
+                    {
+                        vol.Required(ATTR_ENTITY_ID): cv.entity_id,
+                        vol.Optional(ATTR_STATE): cv.boolean,
+                        vol.Optional(ATTR_DAMPER): vol.All(vol.Coerce(int), vol.Range(min=0, max=100)),
+                    }
+                )
+            ],
+        )
+    }
+)
+
 async def async_setup_entry(hass, entry, async_add_entities):
     """Set up AirTouch3 climate based on config_entry."""
-    vzduch_api = hass.data[AT3_DOMAIN].get(entry.entry_id)
-    _LOGGER.debug(f"[AT3Climate] Init {vzduch_api.name}")
-    async_add_entities([AirTouch3Climate(vzduch_api)], update_before_add=True)
+    coordinator = hass.data[AT3_DOMAIN].get(entry.entry_id)
+    vzduch_api = coordinator.api
+    _LOGGER.debug(f"[AT3Climate] Init {vzduch_api.host}")
+    async_add_entities([AirTouch3Climate(coordinator, aircon.id) for aircon in vzduch_api.aircons])
+
+    if not hass.services.has_service(AT3_DOMAIN, "set_zones"):
+        register_services(hass)
+
+def entity_coordinator(hass, entity_id):
+    """Return the coordinator of the config entry, and so the Vzduch server, that owns entity_id, or None"""
+    registry_entry = entity_registry.async_get(hass).async_get(entity_id)
+    if registry_entry is None:
+        return None
+    return hass.data.get(AT3_DOMAIN, {}).get(registry_entry.config_entry_id)
+
+def register_services(hass):
+    """Register the services once for all config entries. Each entity in a call is resolved
+    to the Vzduch server of its own config entry."""
 
     async def handle_set_zone_temperature(call):
         """Handle the service call."""
@@ -136,7 +185,8 @@ async def async_setup_entry(hass, entry, async_add_entities):
             return
 
         entity_item = hass.states.get(entity_id)
-        if entity_item is None:
+        coordinator = entity_coordinator(hass, entity_id)
+        if entity_item is None or coordinator is None:
             _LOGGER.warning(f"[AT3Climate.handle_set_zone_temperature] Entity not found {entity_id}")
             return
 
@@ -145,30 +195,112 @@ async def async_setup_entry(hass, entry, async_add_entities):
             _LOGGER.warning(f"[AT3Climate.handle_set_zone_temperature] Entity does not have id attribute {entity_item}")
             return
 
-        current_desired_temperature = entity_item.attributes['desired_temperature']
-        if current_desired_temperature is None:
-            _LOGGER.warning(f"[AT3Climate.handle_set_zone_temperature] Entity does not have desired_temperature attribute {entity_item}")
+        aircon = coordinator.api.aircon(entity_item.attributes.get('aircon_id', 0))
+        if aircon is None:
+            _LOGGER.warning(f"[AT3Climate.handle_set_zone_temperature] Aircon not found for {entity_item}")
             return
 
-        while desired_temperature != current_desired_temperature:
-            current_desired_temperature = await vzduch_api.set_zone_temperature(zone_id, desired_temperature)
-            _LOGGER.debug(f"current_desired_temperature {current_desired_temperature} {desired_temperature}")
-            if current_desired_temperature is None:
-                _LOGGER.warning(f"[AT3Climate.handle_set_zone_temperature] Desired Temperature failed. Try again")
-                break
-            if current_desired_temperature == 0:
-                _LOGGER.warning(f"[AT3Climate.handle_set_zone_temperature] Desired Temperature for zone id {zone_id} cannot be set. Zone is non temperature controlled")
-                break
+        current_desired_temperature = await aircon.set_zone_temperature(zone_id, desired_temperature)
+        _LOGGER.debug(f"current_desired_temperature {current_desired_temperature} {desired_temperature}")
+        if current_desired_temperature is None:
+            _LOGGER.warning(f"[AT3Climate.handle_set_zone_temperature] Desired Temperature failed. Try again")
+        elif current_desired_temperature == 0:
+            _LOGGER.warning(f"[AT3Climate.handle_set_zone_temperature] Desired Temperature for zone id {zone_id} cannot be set. Zone is non temperature controlled")
+        coordinator.async_push_update()
 
     hass.services.async_register(AT3_DOMAIN, "set_zone_temperature", handle_set_zone_temperature)
 
-
-class AirTouch3Climate(ClimateEntity):
+    async def handle_set_zones(call):
+        """Handle the service call. The zones of each server are sent as one batch followed by one refresh."""
+        _LOGGER.debug(f"[AT3Climate.handle_set_zones] Call Data [{call}]")
+
+        batches = {}
+        for zone in call.data[ATTR_ZONES]:
+            entity_item = hass.states.get(zone[ATTR_ENTITY_ID])
+            coordinator = entity_coordinator(hass, zone[ATTR_ENTITY_ID])
+            if entity_item is None or coordinator is None or entity_item.attributes.get('id') is None:
+                _LOGGER.warning(f"[AT3Climate.handle_set_zones] Zone entity not found {zone[ATTR_ENTITY_ID]}")
+                continue
+            status = None
+            if ATTR_STATE in zone:
+                status = ZONE_ON if zone[ATTR_STATE] else ZONE_OFF
+            batches.setdefault(coordinator, []).append((
+                entity_item.attributes.get('aircon_id', 0),
+                entity_item.attributes['id'],
+                status,
+                zone.get(ATTR_DAMPER)))
+
+        sent = await asyncio.gather(*[coordinator.api.set_zones(targets) for coordinator, targets in batches.items()])
+        _LOGGER.debug(f"[AT3Climate.handle_set_zones] {sum(sent)} commands to {len(batches)} servers")
+        for coordinator in batches:
+            coordinator.async_push_update()
+
+    hass.services.async_register(AT3_DOMAIN, "set_zones", handle_set_zones, schema=SET_ZONES_SCHEMA)
+
+    def scene_aircon_ids(call):
+        """The aircons of the climate entities in the call by coordinator, or every aircon of every
+        server when none are given."""
+        entity_ids = call.data.get(ATTR_ENTITY_ID)
+        if not entity_ids:
+            return {
+                coordinator: [aircon.id for aircon in coordinator.api.aircons]
+                for coordinator in hass.data.get(AT3_DOMAIN, {}).values()
+            }
+        aircon_ids = {}
+        for entity_id in entity_ids:
+            entity_item = hass.states.get(entity_id)
+            coordinator = entity_coordinator(hass, entity_id)
+            if entity_item is None or coordinator is None or entity_item.attributes.get('aircon_id') is None:
+                _LOGGER.warning(f"[AT3Climate] Climate entity not found {entity_id}")
+                continue
+            aircon_ids.setdefault(coordinator, []).append(entity_item.attributes['aircon_id'])
+        return aircon_ids
+
+    async def handle_snapshot(call):
+        """Save the current settings of the aircons and their zones under a name, per server."""
+        name = call.data[ATTR_SCENE_NAME]
+        for coordinator, ac_ids in scene_aircon_ids(call).items():
+            aircon_scenes = {}
+            for ac_id in ac_ids:
+                aircon = coordinator.api.aircon(ac_id)
+                if aircon is not None:
+                    aircon_scenes[ac_id] = aircon.scene()
+            await coordinator.scenes.async_save_scene(name, aircon_scenes)
+            _LOGGER.debug(f"[AT3Climate.handle_snapshot] Saved scene {name} for {coordinator.api.host} aircons {list(aircon_scenes)}")
+
+    async def handle_restore(call):
+        """Bring the aircons and their zones back to a saved scene."""
+        name = call.data[ATTR_SCENE_NAME]
+        restores = []
+        restored = []
+        for coordinator, aircon_ids in scene_aircon_ids(call).items():
+            saved = await coordinator.scenes.async_get_scene(name)
+            if saved is None:
+                _LOGGER.warning(f"[AT3Climate.handle_restore] Scene {name} not found for {coordinator.api.host}")
+                continue
+            vzduch_api = coordinator.api
+            restores.extend(
+                vzduch_api.aircon(ac_id).restore_scene(scene)
+                for ac_id, scene in saved.items()
+                if ac_id in aircon_ids and vzduch_api.aircon(ac_id) is not None
+            )
+            restored.append(coordinator)
+
+        changed = await asyncio.gather(*restores)
+        _LOGGER.debug(f"[AT3Climate.handle_restore] Restored scene {name}, {sum(changed)} settings changed")
+        for coordinator in restored:
+            coordinator.async_push_update()
+
+    hass.services.async_register(AT3_DOMAIN, "snapshot", handle_snapshot, schema=SCENE_SCHEMA)
+    hass.services.async_register(AT3_DOMAIN, "restore", handle_restore, schema=SCENE_SCHEMA)
+
+
+class AirTouch3Climate(AirTouch3Entity, ClimateEntity):
     """Representation of a AirTouch3 Unit."""
 
-    def __init__(self, api):
+    def __init__(self, coordinator, ac_id):
         """Initialize"""
-        self._api = api
+        super().__init__(coordinator, ac_id)
         self._list = {
             ATTR_HVAC_MODE: list(HA_STATE_TO_AT3),
             ATTR_FAN_MODE: list(HA_FAN_MODE_TO_AT3)
@@ -183,7 +315,7 @@ class AirTouch3Climate(ClimateEntity):
     @property
     def device_info(self):
         """Return a device description for device registry."""
-        return self._api.device_info
+        return self._aircon.device_info
 
     @property
     def icon(self):
@@ -193,12 +325,12 @@ class AirTouch3Climate(ClimateEntity):
     @property
     def name(self):
         """Return the name of the thermostat, if any."""
-        return self._api.name
+        return self._aircon.name
 
     @property
     def unique_id(self):
         """Return a unique ID."""
-        return self._api.airtouch_id
+        return self._aircon.airtouch_id
 
     @property
     def temperature_unit(self):
@@ -213,12 +345,12 @@ class AirTouch3Climate(ClimateEntity):
     @property
     def current_temperature(self):
         """Return the current temperature."""
-        return self._api.room_temperature
+        return self._aircon.room_temperature
 
     @property
     def target_temperature(self):
         """Return the temperature we try to reach."""
-        return self._api.desired_temperature
+        return self._aircon.desired_temperature
 
     @property
     def target_temperature_step(self):
@@ -228,16 +360,19 @@ class AirTouch3Climate(ClimateEntity):
     @property
     def hvac_action(self):
         """The current HVAC action (heating, cooling)"""
-        if self._api.power == AC_POWER_OFF:
+        if self._aircon.power == AC_POWER_OFF:
             return CURRENT_HVAC_OFF
             
-        ac_mode = self._api.mode
+        ac_mode = self._aircon.mode
         return HA_STATE_TO_CURRENT_STATE.get(AT3_TO_HA_STATE.get(ac_mode, HVAC_MODE_HEAT_COOL), CURRENT_HVAC_IDLE)
 
     @property
     def hvac_mode(self):
         """Return current operation ie. heat, cool, idle. Used to determine state."""
-        ac_mode = self._api.mode
+        if self._aircon.power == AC_POWER_OFF:
+            return HVAC_MODE_OFF
+
+        ac_mode = self._aircon.mode
         return AT3_TO_HA_STATE.get(ac_mode, HVAC_MODE_HEAT_COOL)
 
     @property
@@ -248,7 +383,7 @@ class AirTouch3Climate(ClimateEntity):
     @property
     def fan_mode(self):
         """Return the fan setting."""
-        ac_fan_mode = self._api.fan_mode
+        ac_fan_mode = self._aircon.fan_mode
         return AT3_TO_HA_FAN_MODE.get(ac_fan_mode, FAN_LOW)
 
     @property
@@ -256,21 +391,39 @@ class AirTouch3Climate(ClimateEntity):
         """List of available fan modes."""
         return self._list.get(ATTR_FAN_MODE)
 
+    @property
+    def extra_state_attributes(self):
+        """attributes for the unit. The server statistics are on the diagnostic sensor"""
+        return {
+            "aircon_id": self._aircon.id,
+        }
+
+    def has_changed(self, changes):
+        """The unit state or the zone used for the zone thermostat mode changed"""
+        if changes.aircon_changed(self._aircon.id):
+            return True
+        temperature_zone = self._aircon.temperature_zone
+        return temperature_zone is not None and (self._aircon.id, temperature_zone.id) in changes.zones
+
     async def async_set_hvac_mode(self, hvac_mode):
-        """Set HVAC mode."""
+        """Set HVAC mode. Power and mode are queued together so they go out in one batch.
+        Off only switches the power, the unit keeps its mode for the next time it is switched on."""
+        commands = []
         if hvac_mode == HVAC_MODE_OFF:
             _LOGGER.debug("[AT3Climate] async_set_hvac_mode Turning AC OFF")
-            await self._api.power_switch(AC_POWER_OFF)
+            commands.append(self._aircon.power_switch(AC_POWER_OFF))
         else:
             _LOGGER.debug(f"[AT3Climate] async_set_hvac_mode Setting hvac_mode mode to {hvac_mode}")
-            if self._api.power == AC_POWER_OFF:
-                await self._api.power_switch(AC_POWER_ON)
-            
-        await self._api.set_mode(HA_STATE_TO_AT3.get(hvac_mode)) #MBTODO
+            if self._aircon.power == AC_POWER_OFF:
+                commands.append(self._aircon.power_switch(AC_POWER_ON))
+            commands.append(self._aircon.set_mode(HA_STATE_TO_AT3.get(hvac_mode)))
+        await asyncio.gather(*commands)
+        self.coordinator.async_push_update()
 
     async def async_set_fan_mode(self, fan_mode):
         """Set fan mode."""
-        await self._api.set_fan_mode(HA_FAN_MODE_TO_AT3.get(fan_mode)) 
+        await self._aircon.set_fan_mode(HA_FAN_MODE_TO_AT3.get(fan_mode)) 
+        self.coordinator.async_push_update()
 
     async def async_set_temperature(self, **kwargs):
         """Set the desired temperature"""
@@ -278,8 +431,5 @@ class AirTouch3Climate(ClimateEntity):
         temperature = kwargs.get(ATTR_TEMPERATURE)
         if temperature is not None:
             _LOGGER.debug(f"[AT3Climate] async_set_temperature Set temperature to [{temperature}]")
-            await self._api.set_temperature(temperature)
-
-    async def async_update(self):
-        """Retrieve latest state."""
-        await self._api.async_update()
\ No newline at end of file
+            await self._aircon.set_temperature(temperature)
+            self.coordinator.async_push_update()
\ No newline at end of file
@@ -1,15 +1,29 @@
 import asyncio
+import ipaddress
 import logging
 import voluptuous as vol
 
+from aiohttp import ClientError, web_exceptions
 from async_timeout import timeout
-from custom_components.airtouch3.vzduch import Vzduch
+from custom_components.airtouch3.vzduch import Vzduch, discover_servers
 
 from homeassistant import config_entries, core
 from homeassistant.const import CONF_HOST, CONF_PORT
+from homeassistant.util import get_local_ip
 
 from . import config_flow
-from .const import DEFAULT_PORT, DOMAIN, TIMEOUT
+from .const import (
+    CONF_LOG_PAYLOADS,
+    CONF_POLL_CEILING,
+    CONF_POLL_FLOOR,
+    CONF_SUBNET,
+    DEFAULT_POLL_CEILING,
+    DEFAULT_POLL_FLOOR,
+    DEFAULT_PORT,
+    DOMAIN,
+    MIN_POLL_FLOOR,
+    TIMEOUT,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -20,6 +34,16 @@ class AirTouch3ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     VERSION = 1
     CONNECTION_CLASS = config_entries.CONN_CLASS_LOCAL_POLL
 
+    def __init__(self):
+        """Initialize"""
+        self._discovered = {}
+
+    @staticmethod
+    @core.callback
+    def async_get_options_flow(config_entry):
+        """Get the options flow for this handler."""
+        return AirTouch3OptionsFlow(config_entry)
+
     @core.callback
     def _async_get_entry(self, data):
 
@@ -36,16 +60,19 @@ class AirTouch3ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         if user_input is None:
             return self.async_show_form(step_id="user", data_schema=self.schema)
 
+        if not user_input.get(CONF_HOST):
+            return await self.async_step_discover()
+
         errors = {}
         host = user_input[CONF_HOST]
-        port = user_input[CONF_PORT]
+        port = user_input.get(CONF_PORT, DEFAULT_PORT)
 
         try:
             _LOGGER.debug("create_device")
             session = self.hass.helpers.aiohttp_client.async_get_clientsession()
             with timeout(TIMEOUT):
                 _LOGGER.debug("Call vzduch")
-                device = Vzduch(session, host, port, timeout)
+                device = Vzduch(session, host, port, TIMEOUT)
                 await device.async_update()
         except asyncio.TimeoutError:
             return self.async_show_form(
@@ -68,18 +95,69 @@ class AirTouch3ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 step_id="user", data_schema=self.schema, errors={"base": "device_fail"},
             )
 
-        _LOGGER.debug(f"Device with name AirTouch_{device.name} has been setup")
+        if not device.available:
+            return self.async_show_form(
+                step_id="user", data_schema=self.schema, errors={"base": "device_fail"},
+            )
+
+        _LOGGER.debug("Vzduch server %s serving %s has been setup", device.host,
+                      [aircon.name for aircon in device.aircons])
 
         return self._async_get_entry(user_input)
 
 
+    async def async_step_discover(self, user_input=None):
+        """Scan a subnet for Vzduch.Dotek Net servers."""
+        errors = {}
+        if user_input is not None:
+            try:
+                found = await discover_servers(user_input[CONF_SUBNET], user_input[CONF_PORT])
+            except ValueError:
+                errors["base"] = "invalid_subnet"
+            else:
+                configured = {entry.data[CONF_HOST] for entry in self._async_current_entries()}
+                self._discovered = {server.host: server for server in found if server.host not in configured}
+                if self._discovered:
+                    return await self.async_step_pick()
+                errors["base"] = "no_devices_found"
+
+        local_ip = await self.hass.async_add_executor_job(get_local_ip)
+        return self.async_show_form(
+            step_id="discover",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(CONF_SUBNET, default=str(ipaddress.ip_network(f"{local_ip}/24", strict=False))): str,
+                    vol.Required(CONF_PORT, default=DEFAULT_PORT): int,
+                }
+            ),
+            errors=errors,
+        )
+
+    async def async_step_pick(self, user_input=None):
+        """Choose one of the discovered servers."""
+        if user_input is not None:
+            server = self._discovered[user_input[CONF_HOST]]
+            return self._async_get_entry({CONF_HOST: server.host, CONF_PORT: server.port})
+
+        return self.async_show_form(
+            step_id="pick",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(CONF_HOST): vol.In({
+                        host: f"{host} ({', '.join(server.aircons)})"
+                        for host, server in self._discovered.items()
+                    }),
+                }
+            ),
+        )
+
     async def create_device(self, host, port=DEFAULT_PORT):
         try:
             _LOGGER.debug("create_device")
             session = self.hass.helpers.aiohttp_client.async_get_clientsession()
             with timeout(TIMEOUT):
                 _LOGGER.debug("Call vzduch")
-                device = await Vzduch(session, host, port, timeout)
+                device = await Vzduch(session, host, port, TIMEOUT)
         except asyncio.TimeoutError:
             return self.async_show_form(
                 step_id="user",
@@ -111,7 +189,45 @@ class AirTouch3ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         """Return current schema."""
         return vol.Schema(
             {
-                vol.Required(CONF_HOST): str,
+                vol.Optional(CONF_HOST): str,
                 vol.Optional(CONF_PORT): int
             }
-        )
\ No newline at end of file
+        )
+
+class AirTouch3OptionsFlow(config_entries.OptionsFlow):
+    """AirTouch 3 polling and logging options."""
+
+    def __init__(self, config_entry):
+        """Initialize"""
+        self.config_entry = config_entry
+
+    async def async_step_init(self, user_input=None):
+        """Poll interval floor and ceiling in seconds."""
+        errors = {}
+        if user_input is not None:
+            if user_input[CONF_POLL_CEILING] < user_input[CONF_POLL_FLOOR]:
+                errors["base"] = "ceiling_below_floor"
+            else:
+                return self.async_create_entry(title="", data=user_input)
+
+        options = self.config_entry.options
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(
+                        CONF_POLL_FLOOR,
+                        default=options.get(CONF_POLL_FLOOR, DEFAULT_POLL_FLOOR),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=MIN_POLL_FLOOR)),
+                    vol.Required(
+                        CONF_POLL_CEILING,
+                        default=options.get(CONF_POLL_CEILING, DEFAULT_POLL_CEILING),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=MIN_POLL_FLOOR)),
+                    vol.Required(
+                        CONF_LOG_PAYLOADS,
+                        default=options.get(CONF_LOG_PAYLOADS, False),
+                    ): bool,
+                }
+            ),
+            errors=errors,
+        )
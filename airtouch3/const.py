@@ -10,11 +10,35 @@ from homeassistant.const import (
 )
 
 DEFAULT_PORT = 8899
+CONF_SUBNET = "subnet"
 DOMAIN = "airtouch3"
-TIMEOUT = 60
+# Seconds allowed for each request to the Vzduch server
+TIMEOUT = 10
+
+# Log every parsed Vzduch response at debug level
+CONF_LOG_PAYLOADS = "log_payloads"
+
+# Adaptive polling. Seconds between polls stay within floor and ceiling, the floor is used
+# for FAST_POLL_WINDOW seconds after a command and the interval grows by POLL_BACKOFF_FACTOR
+# per idle poll while every aircon is off
+CONF_POLL_FLOOR = "poll_floor"
+CONF_POLL_CEILING = "poll_ceiling"
+DEFAULT_POLL_FLOOR = 10
+DEFAULT_POLL_CEILING = 300
+MIN_POLL_FLOOR = 2
+FAST_POLL_WINDOW = 60
+POLL_BACKOFF_FACTOR = 2
 
 ATTR_INSIDE_TEMPERATURE = "inside_temperature"
 
+EVENT_COMMAND_REJECTED = "airtouch3_command_rejected"
+
+SCENES_STORAGE_VERSION = 1
+
+# Last known state, saved so entities can be created before the unit answers at startup
+STATE_STORAGE_VERSION = 1
+STATE_SAVE_DELAY = 15
+
 FAN_QUIET = "Quiet"
 FAN_LOW = "Low"
 FAN_MEDIUM = "Medium"
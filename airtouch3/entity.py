@@ -0,0 +1,71 @@
+"""Base entity for the AirTouch 3 platforms."""
+import logging
+
+from homeassistant.core import callback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from custom_components.airtouch3.vzduch import AC_POWER_OFF
+
+_LOGGER = logging.getLogger(__name__)
+
+def trend_attributes(aircon, trend, set_point):
+    """State attributes describing a TemperatureTrend. There is no time to set point while the aircon is off."""
+    if trend is None:
+        return {}
+    mean = trend.mean
+    rate = trend.rate
+    time_to_set_point = None
+    if aircon.power != AC_POWER_OFF and set_point:
+        time_to_set_point = trend.time_to(set_point)
+    return {
+        "temperature_mean": round(mean, 2) if mean is not None else None,
+        "temperature_rate": round(rate, 2) if rate is not None else None,
+        "time_to_set_point": round(time_to_set_point, 1) if time_to_set_point is not None else None,
+    }
+
+class AirTouch3Entity(CoordinatorEntity):
+    """An entity that only writes its state when its slice of the Vzduch data changed."""
+
+    def __init__(self, coordinator, ac_id):
+        """Initialize"""
+        super().__init__(coordinator)
+        self._api = coordinator.api
+        self._aircon = self._api.aircon(ac_id)
+        self._was_status = None
+        self._was_derived = None
+
+    @property
+    def _entry(self):
+        """The snapshot entry this entity shows, None once the server no longer reports it"""
+        return self._aircon
+
+    @property
+    def available(self):
+        """Unavailable while the snapshot has no entry for this entity"""
+        return super().available and self._entry is not None
+
+    def has_changed(self, changes):
+        """Return True if the given VzduchChanges affect this entity.
+        Entities that do not narrow this down write on every update."""
+        return True
+
+    def derived_attributes(self):
+        """Return attributes worked out from more than this entity's data, such as trends.
+        The state is written whenever they differ from the last written ones"""
+        return {}
+
+    @callback
+    def _handle_coordinator_update(self):
+        """Write state only on an availability or staleness change, a change to this entity's data
+        or a change to its derived attributes. An entity created from the restored state for an entry
+        the server does not report is removed once the server has answered."""
+        if self._entry is None and not self._api.stale:
+            _LOGGER.debug(f"[AT3Entity] Removing {self.entity_id}, the server does not report it")
+            self.hass.async_create_task(self.async_remove())
+            return
+        status = (self.available, self._api.stale)
+        derived = self.derived_attributes()
+        if status != self._was_status or derived != self._was_derived or self.has_changed(self.coordinator.data):
+            self._was_status = status
+            self._was_derived = derived
+            self.async_write_ha_state()
@@ -14,6 +14,7 @@ SUPPORTED_FEATURES = \
     SUPPORT_SET_SPEED
 
 from . import DOMAIN as AT3_DOMAIN
+from .entity import AirTouch3Entity
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -24,29 +25,37 @@ ZONE_OFF = 0
 
 async def async_setup_entry(hass, entry, async_add_entities):
     """Set up AirTouch3 Dampers."""
-    vzduch_api = hass.data[AT3_DOMAIN].get(entry.entry_id)
-    _LOGGER.debug(f"[AT3Fan] Init {vzduch_api.name}")
-    zones = vzduch_api.zones
+    coordinator = hass.data[AT3_DOMAIN].get(entry.entry_id)
+    vzduch_api = coordinator.api
+    _LOGGER.debug(f"[AT3Fan] Init {vzduch_api.host}")
+    zones = [
+        ZoneFan(coordinator, aircon.id, zone.id)
+        for aircon in vzduch_api.aircons
+        for zone in aircon.zones
+    ]
     if zones:
-        async_add_entities(
-            [
-                ZoneFan(vzduch_api, zone.id)
-                for zone_index, zone in enumerate(zones)
-            ]
-        )
-
-class ZoneFan(FanEntity):
+        async_add_entities(zones)
+
+class ZoneFan(AirTouch3Entity, FanEntity):
     """AirTouch3 Damper."""
 
-    def __init__(self, api, zone_id):
+    def __init__(self, coordinator, ac_id, zone_id):
         """Initialize the zone."""
+        super().__init__(coordinator, ac_id)
         _LOGGER.debug(f"[AT3Fan] Zone ID Is {zone_id}")
-        zone_id_filter = filter(lambda x: x.id == zone_id, api.zones)
-
-        self._api = api
-        self._zone = next(zone_id_filter)
+        self._zone_id = zone_id
         self._supported_features = SUPPORTED_FEATURES
 
+    @property
+    def _zone(self):
+        """The current snapshot of the zone"""
+        return self._aircon.zone(self._zone_id)
+
+    @property
+    def _entry(self):
+        """The zone is the snapshot entry of this entity"""
+        return self._zone
+
     @property
     def supported_features(self):
         """Return the list of supported features."""
@@ -60,25 +69,25 @@ class ZoneFan(FanEntity):
     @property
     def unique_id(self):
         """Return a unique ID."""
-        return f"{self._api.airtouch_id}-{self._zone.id}"
+        return f"{self._aircon.airtouch_id}-{self._zone_id}"
 
     @property
     def device_info(self):
         """Return a device description for device registry."""
         return {
             "zone name": self._zone.name,
-            "id": self._zone.id
+            "id": self._zone_id
         }
 
     @property
     def name(self):
         """Returns zone name"""
-        return self._zone.name
+        return self._zone.name if self._zone is not None else None
 
     @property
     def id(self):
         """Returns zone id"""
-        return self._zone.id
+        return self._zone_id
 
     @property
     def status(self):
@@ -95,12 +104,18 @@ class ZoneFan(FanEntity):
         """Returns the fan % value"""
         return self._zone.fan_value
 
+    def has_changed(self, changes):
+        """The zone state changed"""
+        return (self._aircon.id, self._zone_id) in changes.zones
+
     @property
     def extra_state_attributes(self):
         """attributes for the zone"""
         return {
             "fan_value": self._zone.fan_value,
-            "id": self._zone.id,
+            "id": self._zone_id,
+            "aircon_id": self._aircon.id,
+            "stale": self._api.stale,
             "desired_temperature": self._zone.desired_temperature
             }
 
@@ -109,26 +124,26 @@ class ZoneFan(FanEntity):
         """Return the zone desired temperature."""
         return self._zone.desired_temperature
 
-    async def async_update(self):
-        """Retrieve latest state."""
-        await self._api.async_update()
-
     async def async_turn_on(self, **kwargs):
         """Turn the entity on."""
         _LOGGER.debug(f"[AT3Fan] async_turn_on")
-        await self._api.zone_switch(self._zone.id, ZONE_ON)
+        await self._aircon.zone_switch(self._zone_id, ZONE_ON)
+        self.coordinator.async_push_update()
 
     async def async_turn_off(self, **kwargs):
         """Turn the entity off."""
         _LOGGER.debug(f"[AT3Fan] async_turn_off")
-        await self._api.zone_switch(self._zone.id, ZONE_OFF)
+        await self._aircon.zone_switch(self._zone_id, ZONE_OFF)
+        self.coordinator.async_push_update()
 
     async def async_toggle(self, **kwargs):
         """Toggle the entity."""
         _LOGGER.debug(f"[AT3Fan] async_toggle")
-        await self._api.zone_toggle(self._zone.id)
+        await self._aircon.zone_toggle(self._zone_id)
+        self.coordinator.async_push_update()
 
     async def async_set_percentage(self, percentage):
         """Toggle the entity."""
         _LOGGER.debug(f"[AT3Fan] async_set_percentage")
-        await self._api.set_zone_damper(self._zone.id, percentage)
\ No newline at end of file
+        await self._aircon.set_zone_damper(self._zone_id, percentage)
+        self.coordinator.async_push_update()
\ No newline at end of file
@@ -0,0 +1,39 @@
+"""Named AirTouch 3 scenes, kept in memory and in Home Assistant storage."""
+import logging
+
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN, SCENES_STORAGE_VERSION
+
+_LOGGER = logging.getLogger(__name__)
+
+class AirTouch3Scenes:
+    """The scenes saved for one Vzduch server. Each scene holds a Vzduch_Aircon.scene() per aircon id."""
+
+    def __init__(self, hass, host):
+        """Initialize"""
+        self._store = Store(hass, SCENES_STORAGE_VERSION, f"{DOMAIN}.scenes.{host}")
+        self._scenes = None
+
+    async def _async_load(self):
+        """Load the scenes from storage on first use."""
+        if self._scenes is None:
+            self._scenes = await self._store.async_load() or {}
+            _LOGGER.debug(f"[AT3Scenes] Loaded {len(self._scenes)} scenes")
+        return self._scenes
+
+    async def async_save_scene(self, name, aircon_scenes):
+        """Save the scenes of the given aircons (aircon id to scene) under name.
+        Aircons not given keep what was saved for them before."""
+        scenes = await self._async_load()
+        scenes.setdefault(name, {}).update(
+            {str(ac_id): scene for ac_id, scene in aircon_scenes.items()})
+        await self._store.async_save(scenes)
+
+    async def async_get_scene(self, name):
+        """Return the scenes saved under name as aircon id to scene, or None."""
+        scenes = await self._async_load()
+        saved = scenes.get(name)
+        if saved is None:
+            return None
+        return {int(ac_id): scene for ac_id, scene in saved.items()}
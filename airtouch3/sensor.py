@@ -8,9 +8,11 @@ from homeassistant.const import (
     CONF_NAME,
     CONF_TYPE,
     CONF_UNIT_OF_MEASUREMENT,
-    TEMP_CELSIUS
+    TEMP_CELSIUS,
+    TIME_SECONDS,
 )
 from homeassistant.helpers.entity import Entity
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from .const import (
     ATTR_INSIDE_TEMPERATURE,
@@ -18,40 +20,50 @@ from .const import (
 )
 
 from . import DOMAIN as AT3_DOMAIN
+from .entity import AirTouch3Entity, trend_attributes
 
 SENSOR_ICON = "mdi:home-thermometer-outline"
+DIAGNOSTIC_ICON = "mdi:timer-sync-outline"
 
 _LOGGER = logging.getLogger(__name__)
 
 async def async_setup_entry(hass, entry, async_add_entities):
     """Set up AirTouch 3 sensor based on config_entry."""
-    vzduch_api = hass.data[AT3_DOMAIN].get(entry.entry_id)
-    _LOGGER.debug(f"[AT3Sensor] Init {vzduch_api.name}")
-    sensors = vzduch_api.sensors
-    if sensors:
-        async_add_entities(
-            [
-                AT3Sensor(vzduch_api, sensor.id)
-                for sensor_index, sensor in enumerate(sensors)
-                if sensor.is_available
-            ]
-        )
-
-class AT3Sensor(Entity):
+    coordinator = hass.data[AT3_DOMAIN].get(entry.entry_id)
+    vzduch_api = coordinator.api
+    _LOGGER.debug(f"[AT3Sensor] Init {vzduch_api.host}")
+    sensors = [
+        AT3Sensor(coordinator, aircon.id, sensor.id)
+        for aircon in vzduch_api.aircons
+        for sensor in aircon.sensors
+        if sensor.is_available
+    ]
+    sensors.append(VzduchDiagnosticSensor(coordinator, entry.entry_id))
+    async_add_entities(sensors)
+
+class AT3Sensor(AirTouch3Entity, Entity):
     """Representation of a AirTouch 3 temperature sensor."""
 
-    def __init__(self, api, sensor_id):
+    def __init__(self, coordinator, ac_id, sensor_id):
         """Initialize the sensor."""
+        super().__init__(coordinator, ac_id)
         _LOGGER.debug(f"[AT3Sensor] Sensor ID Is {sensor_id}")
-        sensor_id_filter = filter(lambda x: x.id == sensor_id, api.sensors)
+        self._sensor_id = sensor_id
 
-        self._api = api
-        self._sensor = next(sensor_id_filter)
+    @property
+    def _sensor(self):
+        """The current snapshot of the sensor"""
+        return self._aircon.sensor(self._sensor_id)
+
+    @property
+    def _entry(self):
+        """The sensor is the snapshot entry of this entity"""
+        return self._sensor
 
     @property
     def unique_id(self):
         """Return a unique ID."""
-        return f"{self._api.airtouch_id}-{self._sensor.id}"
+        return f"{self._aircon.airtouch_id}-{self._sensor_id}"
 
     @property
     def icon(self):
@@ -61,7 +73,7 @@ class AT3Sensor(Entity):
     @property
     def id(self):
         """Returns sensor id"""
-        return self._sensor.id
+        return self._sensor_id
 
     @property
     def is_available(self):
@@ -87,14 +99,68 @@ class AT3Sensor(Entity):
     def device_class(self):
         return SENSOR_TYPE_TEMPERATURE
 
+    def has_changed(self, changes):
+        """The sensor reading changed"""
+        return (self._aircon.id, self._sensor_id) in changes.sensors
+
+    def derived_attributes(self):
+        """Trend of the sensor readings"""
+        zone = self._aircon.sensor_zone(self._sensor_id)
+        return trend_attributes(
+            self._aircon,
+            self._aircon.sensor_trend(self._sensor_id),
+            self._aircon.zone_set_point(zone) if zone is not None else None)
+
     @property
     def extra_state_attributes(self):
         """attributes for the sensor"""
         return {
             "is_available": self._sensor.is_available, 
-            "is_low_battery": self._sensor.is_low_battery
+            "is_low_battery": self._sensor.is_low_battery,
+            "stale": self._api.stale,
+            **self.derived_attributes()
             }
 
-    async def async_update(self):
-        """Retrieve latest state."""
-        await self._api.async_update()
\ No newline at end of file
+class VzduchDiagnosticSensor(CoordinatorEntity, Entity):
+    """The poll interval of a Vzduch server, with the fetch, parse and command statistics as attributes.
+    Written on every coordinator update, unlike the aircon entities."""
+
+    def __init__(self, coordinator, entry_id):
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        self._entry_id = entry_id
+
+    @property
+    def unique_id(self):
+        """Return a unique ID."""
+        return f"{self._entry_id}-diagnostics"
+
+    @property
+    def name(self):
+        """Return the name of the sensor."""
+        return f"AirTouch {self.coordinator.api.host} poll interval"
+
+    @property
+    def icon(self):
+        """Front End Icon"""
+        return DIAGNOSTIC_ICON
+
+    @property
+    def available(self):
+        """The statistics are meaningful even while the server is unreachable."""
+        return True
+
+    @property
+    def state(self):
+        """Returns the seconds until the next scheduled poll"""
+        return self.coordinator.poll_interval
+
+    @property
+    def unit_of_measurement(self):
+        """Return the unit of measurement."""
+        return TIME_SECONDS
+
+    @property
+    def extra_state_attributes(self):
+        """The fetch, parse and command statistics of the server"""
+        return self.coordinator.stats
@@ -4,6 +4,7 @@ import logging
 from homeassistant.helpers.entity import ToggleEntity
 
 from . import DOMAIN as AT3_DOMAIN
+from .entity import AirTouch3Entity, trend_attributes
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -14,27 +15,35 @@ ZONE_OFF = 0
 
 async def async_setup_entry(hass, entry, async_add_entities):
     """Set up AirTouch3 zones."""
-    vzduch_api = hass.data[AT3_DOMAIN].get(entry.entry_id)
-    _LOGGER.debug(f"[AT3Zone] Init {vzduch_api.name}")
-    zones = vzduch_api.zones
+    coordinator = hass.data[AT3_DOMAIN].get(entry.entry_id)
+    vzduch_api = coordinator.api
+    _LOGGER.debug(f"[AT3Zone] Init {vzduch_api.host}")
+    zones = [
+        ZoneSwitch(coordinator, aircon.id, zone.id)
+        for aircon in vzduch_api.aircons
+        for zone in aircon.zones
+    ]
     if zones:
-        async_add_entities(
-            [
-                ZoneSwitch(vzduch_api, zone.id)
-                for zone_index, zone in enumerate(zones)
-            ]
-        )
-
-class ZoneSwitch(ToggleEntity):
+        async_add_entities(zones)
+
+class ZoneSwitch(AirTouch3Entity, ToggleEntity):
     """AirTouch3 zone."""
 
-    def __init__(self, api, zone_id):
+    def __init__(self, coordinator, ac_id, zone_id):
         """Initialize the zone."""
+        super().__init__(coordinator, ac_id)
         _LOGGER.debug(f"[AT3Zone] Zone ID Is {zone_id}")
-        zone_id_filter = filter(lambda x: x.id == zone_id, api.zones)
+        self._zone_id = zone_id
+
+    @property
+    def _zone(self):
+        """The current snapshot of the zone"""
+        return self._aircon.zone(self._zone_id)
 
-        self._api = api
-        self._zone = next(zone_id_filter)
+    @property
+    def _entry(self):
+        """The zone is the snapshot entry of this entity"""
+        return self._zone
 
     @property
     def icon(self):
@@ -44,25 +53,25 @@ class ZoneSwitch(ToggleEntity):
     @property
     def unique_id(self):
         """Return a unique ID."""
-        return f"{self._api.airtouch_id}-{self._zone.id}"
+        return f"{self._aircon.airtouch_id}-{self._zone_id}"
 
     @property
     def device_info(self):
         """Return a device description for device registry."""
         return {
             "zone name": self._zone.name,
-            "id": self._zone.id
+            "id": self._zone_id
         }
 
     @property
     def name(self):
         """Returns zone name"""
-        return self._zone.name
+        return self._zone.name if self._zone is not None else None
 
     @property
     def id(self):
         """Returns zone id"""
-        return self._zone.id
+        return self._zone_id
 
     @property
     def status(self):
@@ -84,6 +93,23 @@ class ZoneSwitch(ToggleEntity):
         """Returns whether zone is used as a spill."""
         return self._zone.is_spill
 
+    def has_changed(self, changes):
+        """The zone state or a reading of one of its sensors changed"""
+        if (self._aircon.id, self._zone_id) in changes.zones:
+            return True
+        if self._zone is None:
+            return False
+        return any((self._aircon.id, sensor.id) in changes.sensors for sensor in self._zone.sensors)
+
+    def derived_attributes(self):
+        """Trend of the zone's average sensor reading"""
+        if self._zone is None:
+            return {}
+        return trend_attributes(
+            self._aircon,
+            self._aircon.zone_trend(self._zone_id),
+            self._aircon.zone_set_point(self._zone))
+
     @property
     def extra_state_attributes(self):
         """attributes for the zone"""
@@ -91,8 +117,11 @@ class ZoneSwitch(ToggleEntity):
             "zone_temperature_type": self._zone.zone_temperature_type, 
             "fan_value": self._zone.fan_value,
             "is_spill": self._zone.is_spill,
-            "id": self._zone.id,
-            "desired_temperature": self._zone.desired_temperature
+            "id": self._zone_id,
+            "aircon_id": self._aircon.id,
+            "stale": self._api.stale,
+            "desired_temperature": self._zone.desired_temperature,
+            **self.derived_attributes()
             }
 
     @property
@@ -105,21 +134,20 @@ class ZoneSwitch(ToggleEntity):
         """Return the zone desired temperature."""
         return self._zone.desired_temperature
 
-    async def async_update(self):
-        """Retrieve latest state."""
-        await self._api.async_update()
-
     async def async_turn_on(self, **kwargs):
         """Turn the entity on."""
         _LOGGER.debug(f"[AT3Zone] async_turn_on")
-        await self._api.zone_switch(self._zone.id, ZONE_ON)
+        await self._aircon.zone_switch(self._zone_id, ZONE_ON)
+        self.coordinator.async_push_update()
 
     async def async_turn_off(self, **kwargs):
         """Turn the entity off."""
         _LOGGER.debug(f"[AT3Zone] async_turn_off")
-        await self._api.zone_switch(self._zone.id, ZONE_OFF)
+        await self._aircon.zone_switch(self._zone_id, ZONE_OFF)
+        self.coordinator.async_push_update()
 
     async def async_toggle(self, **kwargs):
         """Toggle the entity."""
         _LOGGER.debug(f"[AT3Zone] async_toggle")
-        await self._api.zone_toggle(self._zone.id)
\ No newline at end of file
+        await self._aircon.zone_toggle(self._zone_id)
+        self.coordinator.async_push_update()
\ No newline at end of file
@@ -1,12 +1,24 @@
 import aiohttp
 import asyncio
+import hashlib
+import ipaddress
 import logging
 import json.tool
+import random
 import time
 
+from array import array
+from collections import namedtuple, OrderedDict
 from datetime import timedelta
-from aiohttp import ClientSession, ServerDisconnectedError
-from homeassistant.util import Throttle
+from aiohttp import ClientConnectorError, ClientError, ClientSession, ClientTimeout
+
+try:
+    import orjson
+    json_loads = orjson.loads
+    JSON_BACKEND = "orjson"
+except ImportError:
+    json_loads = json.loads
+    JSON_BACKEND = "json"
 
 _LOGGER = logging.getLogger(__name__)
 MIN_TIME_BETWEEN_UPDATES = timedelta(seconds=60)
@@ -43,6 +55,50 @@ THERMOSTAT_MODE_ZONE = 3
 TEMPERATURE_INCREMENT = 1
 TEMPERATURE_DECREMENT = -1
 
+ZONE_ON = 1
+ZONE_OFF = 0
+
+# Seconds between pipelined set point steps
+DEFAULT_STEP_DELAY = 0.1
+# Seconds commands are held to coalesce repeated writes to the same field
+DEFAULT_COMMAND_WINDOW = 0.25
+# Zone commands of one batch sent at the same time
+DEFAULT_COMMAND_CONCURRENCY = 4
+
+# Transport retries, backoff (seconds) and circuit breaker
+DEFAULT_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_RESET_TIMEOUT = 30
+
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+# Connection pool for the single LAN host
+POOL_CONNECTION_LIMIT = 4
+POOL_KEEPALIVE_TIMEOUT = 60
+POOL_DNS_CACHE_TTL = 300
+
+# LAN discovery. Seconds allowed per probe, probes in flight and the largest network scanned
+DISCOVERY_TIMEOUT = 1.5
+DISCOVERY_CONCURRENCY = 128
+DISCOVERY_MAX_HOSTS = 1024
+
+# Changed responses of at least this many characters are decoded in the executor
+DECODE_EXECUTOR_THRESHOLD = 64 * 1024
+
+# Samples kept per sensor and zone for temperature trends
+TREND_SAMPLES = 30
+
+# Command queue fields
+FIELD_POWER = "power"
+FIELD_MODE = "mode"
+FIELD_FAN_MODE = "fan_mode"
+FIELD_ZONE_STATUS = "zone_status"
+FIELD_ZONE_DAMPER = "zone_damper"
+
 HTTP_GET = "GET"
 HTTP_POST = "POST"
 
@@ -57,37 +113,108 @@ POST_ZONE_TOGGLE = "/api/aircons/{0}/zones/{1}/toggle"
 POST_ZONE_SWITCH = "/api/aircons/{0}/zones/{1}/switch/{2}"
 POST_ZONE_DAMPER = "/api/aircons/{0}/zones/{1}/damper/{2}"
 
+# Aircon level fields and the response keys they are read from
+AC_FIELDS = (
+    ("power", "powerStatus"),
+    ("name", "name"),
+    ("status", "status"),
+    ("mode", "mode"),
+    ("fan_mode", "fanMode"),
+    ("thermostat_mode", "thermostatMode"),
+    ("airtouch_id", "airTouchId"),
+    ("touch_pad_temperature", "touchPadTemperature"),
+    ("room_temperature", "roomTemperature"),
+    ("desired_temperature", "desiredTemperature"),
+)
+
+class VzduchChanges(namedtuple("VzduchChanges", ["fields", "zones", "sensors"])):
+    """What changed since the last time the changes were collected.
+    fields holds (aircon id, field) pairs, zones and sensors hold (aircon id, id) pairs"""
+    __slots__ = ()
+
+    def aircon_changed(self, ac_id):
+        """Return True if any aircon level field of the given aircon changed"""
+        return any(changed_ac == ac_id for changed_ac, _ in self.fields)
+
+NO_CHANGES = VzduchChanges(frozenset(), frozenset(), frozenset())
+
+# A Vzduch.Dotek Net server found on the network and the names of the aircons it serves
+DiscoveredServer = namedtuple("DiscoveredServer", ["host", "port", "aircons"])
+
+async def discover_servers(network, port, timeout = DISCOVERY_TIMEOUT, concurrency = DISCOVERY_CONCURRENCY):
+    """Probe every host of network (for example "192.168.1.0/24") for a Vzduch.Dotek Net server
+    on port. Probes run at most concurrency at a time, each allowed timeout seconds, so a /24
+    takes a few seconds even when most addresses do not answer.
+    Returns a DiscoveredServer for each server found, in address order.
+    Raises ValueError for an invalid network or one with more than DISCOVERY_MAX_HOSTS hosts"""
+    network = ipaddress.ip_network(network, strict=False)
+    if network.num_addresses > DISCOVERY_MAX_HOSTS + 2:
+        raise ValueError(f"Network {network} is too large to scan")
+    hosts = list(network.hosts()) or [network.network_address]
+    _LOGGER.debug(f"[Vzduch] Scanning {len(hosts)} hosts of {network} on port {port}")
+    semaphore = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency, force_close=True)
+
+    async with ClientSession(connector=connector, timeout=ClientTimeout(total=timeout)) as session:
+        async def probe(host):
+            async with semaphore:
+                try:
+                    async with session.get(f"http://{host}:{port}{GET_VZDUCH_INFO}") as resp_obj:
+                        if resp_obj.status != 200:
+                            return None
+                        data = json_loads(await resp_obj.text())
+                    aircons = tuple(aircon["name"] for aircon in data["aircons"])
+                except (asyncio.TimeoutError, ClientError, ValueError, KeyError, TypeError):
+                    return None
+                _LOGGER.debug(f"[Vzduch] Found server at {host}:{port} with aircons {aircons}")
+                return DiscoveredServer(str(host), port, aircons)
+
+        found = await asyncio.gather(*[probe(host) for host in hosts])
+    return [server for server in found if server is not None]
+
 class Vzduch:
-    """Api access to Vzduch.Dotek Net Server"""
+    """Api access to Vzduch.Dotek Net Server. One server can serve several aircons,
+    all of which are read from a single fetch of GET_VZDUCH_INFO"""
 
-    def __init__(self, session, host, port, timeout):
+    def __init__(self, session, host, port, timeout, step_delay = DEFAULT_STEP_DELAY, command_window = DEFAULT_COMMAND_WINDOW,
+                 command_concurrency = DEFAULT_COMMAND_CONCURRENCY, log_payloads = False):
+        """When session is None the client creates and owns a keep-alive session for the host.
+        With log_payloads every parsed response is logged at debug level"""
         self._session = session
+        self._owns_session = False
         self._host = host
         self._port = port
         self._timeout = timeout
+        self._step_delay = step_delay
+        self._log_payloads = log_payloads
+        self._commands = VzduchCommandQueue(self, command_window, command_concurrency)
+        self._command_lock = asyncio.Lock()
+        self._breaker = CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_TIMEOUT)
+        self._write_generation = 0
+        self._inflight = {}
+        self._shared_requests = 0
+        self._discarded_polls = 0
+        self.on_state_changed = None
+        self.on_command_rejected = None
         self._available = False
         self._base_url = "http://{host}:{port}".format(host=self.host, port=self.port)
         _LOGGER.debug(f"[Vzduch] __init__  with [{self._base_url}]")
 
-        self._selected_ac = 0 
-        self._power = AC_POWER_OFF
-        self._name = ''
-        self._status = AC_STATUS_OK
-        self._mode = AC_MODE_AUTO
-        self._fan_mode = AC_FAN_MODE_LOW
-        self._thermostat_mode = 0
-        self._airtouch_id = ''
-        self._touch_pad_temperature = 0
-        self._desired_temperature = 0
-        self._room_temperature = 0
-        self._zones = []
-        self._sensors = []
+        self._aircons = {}
+        self._last_response = None
+        self._stale = False
+        self._last_digest = None
+        self._digest_hits = 0
+        self._digest_misses = 0
+        self._changed_fields = set()
+        self._changed_zones = set()
+        self._changed_sensors = set()
 
     async def fetch_get(self, command):
         """Send command via HTTP GET to Vzduch.Dotek Net server."""
         _LOGGER.debug("[Vzduch] Running fetch GET")
         async with self._session.get("{base_url}{command}".format(
-            base_url=self._base_url, command=command)) as resp_obj:
+            base_url=self._base_url, command=command), timeout=ClientTimeout(total=self._timeout)) as resp_obj:
             response = await resp_obj.text()
             if (resp_obj.status == 200 or resp_obj.status == 204):
                 _LOGGER.debug("[Vzduch] Have a response")
@@ -101,7 +228,7 @@ class Vzduch:
         """Send command via HTTP POST to Vzduch.Dotek Net server."""
         _LOGGER.debug("[Vzduch] Running fetch POST")
         async with self._session.post("{base_url}{command}".format(
-            base_url=self._base_url, command=command), data=data) as resp_obj:
+            base_url=self._base_url, command=command), data=data, timeout=ClientTimeout(total=self._timeout)) as resp_obj:
             response = await resp_obj.text()
             if (resp_obj.status == 200 or resp_obj.status == 204):
                 _LOGGER.debug("[Vzduch] Have a response")
@@ -110,73 +237,226 @@ class Vzduch:
                 _LOGGER.error(f"Host [{self._host}] returned HTTP status code [{resp_obj.status}] for POST command [{command}]")
                 return None
 
-    async def prep_fetch(self, verb, command, data = None, retries = 5):
-        """ Prepare the session and command"""
-        _LOGGER.debug("[Vzduch] Running prep_fetch")
-        try:
-            if self._session and not self._session.closed:
-                if verb == HTTP_GET:
-                    return await self.fetch_get(command)
-                else:
-                    return await self.fetch_post(command, data)
-            async with aiohttp.ClientSession() as self._session:
-                if verb == HTTP_GET:
-                    return await self.fetch_get(command)
-                else:
-                    return await self.fetch_post(command, data)
-        except ValueError:
-            pass
-        except ServerDisconnectedError as error:
-            _LOGGER.debug(f"[Vzduch] Disconnected Error. Retry Count {retries}")
-            if retries == 0:
-                raise error
-            return await self.prep_fetch(command, data, retries=retries - 1)
-
-    @Throttle(MIN_TIME_BETWEEN_UPDATES)
+    async def prep_fetch(self, verb, command, data = None, retries = DEFAULT_RETRIES):
+        """ Prepare the session and command.
+        Concurrent identical GETs share one in flight request. A GET only joins a request
+        started after the last command was sent, so it never returns state older than a command"""
+        if verb != HTTP_GET:
+            self._write_generation += 1
+            return await self.send(verb, command, data, retries)
+
+        key = (command, self._write_generation)
+        inflight = self._inflight.get(key)
+        if inflight is None:
+            inflight = asyncio.ensure_future(self.send(verb, command, data, retries))
+            self._inflight[key] = inflight
+            inflight.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self._shared_requests += 1
+            _LOGGER.debug(f"[Vzduch] Joining in flight GET {command}")
+        return await asyncio.shield(inflight)
+
+    async def send(self, verb, command, data = None, retries = DEFAULT_RETRIES):
+        """ Send the command over the session.
+        Failed GETs are retried with exponential backoff and jitter. Commands are only retried
+        when the connection could not be made, since the +1 / -1 steps are not idempotent.
+        An error status from the server counts as a failure and returns None once retries are used up.
+        While the circuit breaker is open nothing is sent and the server is marked unavailable"""
+        if not self._breaker.allow():
+            _LOGGER.debug(f"[Vzduch] Circuit breaker open, not sending {command}")
+            self._available = False
+            return None
+
+        attempt = 0
+        while True:
+            error = None
+            try:
+                response = await self.send_once(verb, command, data)
+            except ValueError:
+                self._record_failure()
+                return None
+            except (asyncio.TimeoutError, ClientError) as client_error:
+                error = client_error
+                retryable = verb == HTTP_GET or isinstance(error, ClientConnectorError)
+            else:
+                if response is not None:
+                    self._breaker.record_success()
+                    return response
+                # fetch_get / fetch_post already logged the error status
+                retryable = verb == HTTP_GET
+
+            if not retryable or attempt >= retries:
+                self._record_failure()
+                if error is not None:
+                    raise error
+                return None
+            delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+            attempt += 1
+            reason = type(error).__name__ if error is not None else "Error status"
+            _LOGGER.debug(f"[Vzduch] {reason} for {command}. Retry {attempt} of {retries} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    def _record_failure(self):
+        """Count a failed request against the circuit breaker"""
+        self._breaker.record_failure()
+        if self._breaker.state == BREAKER_OPEN:
+            _LOGGER.warning(f"[Vzduch] Host [{self._host}] is not responding. Pausing requests for {BREAKER_RESET_TIMEOUT}s")
+            self._available = False
+
+    async def send_once(self, verb, command, data = None):
+        """ Send the command once over the session"""
+        _LOGGER.debug("[Vzduch] Running send_once")
+        if self._session is None or self._session.closed:
+            self._session = self.create_session()
+            self._owns_session = True
+        if verb == HTTP_GET:
+            return await self.fetch_get(command)
+        else:
+            return await self.fetch_post(command, data)
+
+    def create_session(self):
+        """Create a session with a small keep-alive connection pool for the one host.
+        aiohttp already sets TCP_NODELAY on its connections"""
+        _LOGGER.debug(f"[Vzduch] Creating connection pool for [{self._base_url}]")
+        connector = aiohttp.TCPConnector(
+            limit=POOL_CONNECTION_LIMIT,
+            limit_per_host=POOL_CONNECTION_LIMIT,
+            keepalive_timeout=POOL_KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=POOL_DNS_CACHE_TTL)
+        return aiohttp.ClientSession(connector=connector)
+
+    async def close(self):
+        """Close the session if this client created it"""
+        if self._owns_session and self._session is not None and not self._session.closed:
+            _LOGGER.debug(f"[Vzduch] Closing connection pool for [{self._base_url}]")
+            await self._session.close()
+        self._session = None
+        self._owns_session = False
+
     async def async_update(self, **kwargs):
         """Get the latest status information from Vzduch.Dotek Net server"""
 
         _LOGGER.debug("[Vzduch] Doing async_update")
+        generation = self._write_generation
         response = await self.prep_fetch(HTTP_GET, GET_VZDUCH_INFO)
-        self.set_properties(response)
+        await self.async_set_properties(response, generation)
+
+    async def async_set_properties(self, response, generation = None):
+        """set_properties for callers on the event loop. A large response that changed is decoded
+        in the executor. With generation given the response is discarded if a command was queued
+        or sent since that generation, as the command reply is newer"""
+        data = None
+        digest = None
+        if response is not None:
+            digest = self._digest(response)
+            if len(response) >= DECODE_EXECUTOR_THRESHOLD and digest != self._last_digest:
+                data = await asyncio.get_event_loop().run_in_executor(None, json_loads, response)
+        if generation is not None and (generation != self._write_generation or self._commands.has_pending):
+            self._discarded_polls += 1
+            _LOGGER.debug("[Vzduch] Discarding poll response that raced a command")
+            return
+        self.set_properties(response, data, digest)
 
-    def set_properties(self, response):
+    @staticmethod
+    def _digest(response):
+        """Return a short digest of a response"""
+        return hashlib.blake2b(response.encode(), digest_size=16).digest()
+
+    def set_properties(self, response, data = None, digest = None):
+        """Update the state from a response. data is the response already decoded and digest
+        its _digest, if the caller has them"""
         _LOGGER.debug("[Vzduch] Set properties start")
 
         if (response is not None):
             self._available = True
+            self._stale = False
         else:
             _LOGGER.warning("[Vzduch] Response is None")
             self._available = False
             return
 
-        data = json.loads(response)
-        _LOGGER.debug(f"[Vzduch] Loaded response {data}")
-        self._power = data["aircons"][self._selected_ac]["powerStatus"]
-        self._name = data["aircons"][self._selected_ac]["name"]
-        self._status = data["aircons"][self._selected_ac]["status"]
-        self._mode = data["aircons"][self._selected_ac]["mode"]
-        self._fan_mode = data["aircons"][self._selected_ac]["fanMode"]
-        self._thermostat_mode = data["aircons"][self._selected_ac]["thermostatMode"]
-        self._airtouch_id = data["aircons"][self._selected_ac]["airTouchId"]
-        self._touch_pad_temperature= data["aircons"][self._selected_ac]["touchPadTemperature"]
-        self._room_temperature = data["aircons"][self._selected_ac]["roomTemperature"]
-        self._desired_temperature= data["aircons"][self._selected_ac]["desiredTemperature"]
-        for zone_data in data["aircons"][self._selected_ac]["zones"]:
-            existing_zone = list(filter(lambda x: x.id == zone_data["id"], self._zones))
-            if existing_zone:
-                existing_zone[0].update(zone_data)
-            else:
-                zone = Vzduch_Zone(zone_data)
-                self._zones.append(zone)
-            for sensor_data in zone_data["sensors"]:
-                existing_sensor = list(filter(lambda x: x.id == sensor_data["id"], self._sensors))
-                if existing_sensor:
-                    existing_sensor[0].update(sensor_data)
-                else:
-                    sensor = Vzduch_Sensor(sensor_data)
-                    self._sensors.append(sensor)
-        _LOGGER.debug(f"[Vzduch] Set properties done. Zone count {len(self._zones)}")
+        if digest is None:
+            digest = self._digest(response)
+        if digest == self._last_digest:
+            self._digest_hits += 1
+            _LOGGER.debug("[Vzduch] Response unchanged, skipping parse")
+            self.record_trends()
+            return
+        self._digest_misses += 1
+        self._last_digest = digest
+
+        self._parse(response, data)
+        self.record_trends()
+        _LOGGER.debug(f"[Vzduch] Set properties done. Aircon count {len(self._aircons)}")
+
+    def _parse(self, response, data = None):
+        """Update the aircons from a GET_VZDUCH_INFO response"""
+        if data is None:
+            data = json_loads(response)
+        if self._log_payloads:
+            _LOGGER.debug("[Vzduch] Loaded response %s", response)
+        for ac_id, aircon_data in enumerate(data["aircons"]):
+            aircon = self._aircons.get(ac_id)
+            if aircon is None:
+                aircon = Vzduch_Aircon(self, ac_id)
+                self._aircons[ac_id] = aircon
+            aircon.update(aircon_data, self._changed_fields, self._changed_zones, self._changed_sensors)
+        self._last_response = response
+
+    def restore_state(self, response):
+        """Load a response saved from last_response in an earlier run, so the aircons, zones and
+        sensors exist before the server has answered. The state is stale until a response arrives.
+        Returns False if the saved response could not be read"""
+        try:
+            self._parse(response)
+        except (ValueError, KeyError, TypeError) as error:
+            _LOGGER.warning(f"[Vzduch] Ignoring saved state. {error}")
+            self._aircons = {}
+            self.pop_changes()
+            return False
+        self._stale = True
+        return True
+
+    def record_trends(self):
+        """Add the current readings to the trend buffers of every aircon"""
+        timestamp = time.monotonic()
+        for aircon in self._aircons.values():
+            aircon.record_trends(timestamp)
+
+    def assume_changed(self, field=None, zone=None):
+        """Record a change made to the cached state ahead of the server.
+        Polls already in flight are discarded and the next response is always parsed"""
+        self._write_generation += 1
+        self._last_digest = None
+        if field is not None:
+            self._changed_fields.add(field)
+        if zone is not None:
+            self._changed_zones.add(zone)
+
+    def notify_state_changed(self):
+        """Let the owner know the cached state changed outside of a poll"""
+        if self.on_state_changed is not None:
+            self.on_state_changed()
+
+    def command_rejected(self, key, expected, actual):
+        """Report a command whose effect the server did not confirm"""
+        ac_id, field, zone_id = key
+        _LOGGER.warning(f"[Vzduch] Command {field} for aircon {ac_id} zone {zone_id} not confirmed. Expected {expected} have {actual}")
+        if self.on_command_rejected is not None:
+            self.on_command_rejected(ac_id, field, zone_id, expected, actual)
+
+    def pop_changes(self):
+        """Return what changed since the last call and start collecting afresh"""
+        if not (self._changed_fields or self._changed_zones or self._changed_sensors):
+            return NO_CHANGES
+        changes = VzduchChanges(
+            frozenset(self._changed_fields),
+            frozenset(self._changed_zones),
+            frozenset(self._changed_sensors))
+        self._changed_fields.clear()
+        self._changed_zones.clear()
+        self._changed_sensors.clear()
+        return changes
 
     @property
     def available(self) -> bool:
@@ -184,14 +464,52 @@ class Vzduch:
         return self._available
 
     @property
-    def device_info(self):
-        """Return a device description for device registry."""
+    def stale(self) -> bool:
+        """Return True while the state is restored from an earlier run and not yet refreshed."""
+        return self._stale
+
+    @property
+    def last_response(self):
+        """Return the last response parsed, for restore_state in a later run."""
+        return self._last_response
+
+    @property
+    def parse_stats(self):
+        """Return how often a response was skipped as identical to the previous one"""
         return {
-            "manufacturer": "Polyaire",
-            "model": "AirTouch 3",
-            "name": self._name
+            "unchanged_responses": self._digest_hits,
+            "parsed_responses": self._digest_misses,
         }
 
+    @property
+    def request_stats(self):
+        """Return how often a GET was shared or a poll was discarded for a newer command reply"""
+        return {
+            "shared_requests": self._shared_requests,
+            "discarded_polls": self._discarded_polls,
+            "circuit_breaker": self._breaker.state,
+        }
+
+    @property
+    def log_payloads(self):
+        """Return True if parsed responses are logged at debug level."""
+        return self._log_payloads
+
+    @log_payloads.setter
+    def log_payloads(self, value):
+        """Log parsed responses at debug level."""
+        self._log_payloads = value
+
+    @property
+    def breaker_state(self):
+        """Return the circuit breaker state (closed, open, half_open)"""
+        return self._breaker.state
+
+    @property
+    def command_lock(self):
+        """Return the lock that serializes commands to this server."""
+        return self._command_lock
+
     @property
     def host(self):
         """Return the host address."""
@@ -207,35 +525,244 @@ class Vzduch:
         """Return the timeout."""
         return self._timeout
 
+    @property
+    def commands(self):
+        """Return the command queue for this server."""
+        return self._commands
+
+    @property
+    def step_delay(self):
+        """Return the delay in seconds between pipelined set point steps."""
+        return self._step_delay
+
+    @step_delay.setter
+    def step_delay(self, value):
+        """Set the delay in seconds between pipelined set point steps."""
+        self._step_delay = value
+
+    @property
+    def aircons(self):
+        """Return the aircons served by this Vzduch.Dotek Net server"""
+        return self._aircons.values()
+
+    def aircon(self, ac_id):
+        """Return the aircon with the given id, or None"""
+        return self._aircons.get(ac_id)
+
+    async def set_zones(self, targets):
+        """Switch and set the dampers of many zones in one batch. targets holds
+        (aircon id, zone id, status, damper) tuples, None leaves status or damper alone.
+        Only commands that change the cached state are queued, and the batch is sent
+        straight away instead of waiting for the command window. Returns the number of commands"""
+        waiters = []
+        for ac_id, zone_id, status, damper in targets:
+            aircon = self.aircon(ac_id)
+            if aircon is None:
+                _LOGGER.warning(f"[Vzduch] Aircon with Id {ac_id} not found")
+                continue
+            if status is not None:
+                waiters.append(aircon.queue_zone_switch(zone_id, status))
+            if damper is not None:
+                waiters.append(aircon.queue_zone_damper(zone_id, damper))
+        waiters = [waiter for waiter in waiters if waiter is not None]
+        if not waiters:
+            return 0
+        self._commands.flush_now()
+        await asyncio.gather(*waiters)
+        return len(waiters)
+
+    async def step_set_point(self, command_format, target, read_back):
+        """Move a set point to target. The server only accepts +1 / -1 steps, so the steps
+        are sent pipelined (step_delay apart) and only the final reply is parsed.
+        If that reply has not converged on target, the state is read once more.
+        read_back returns the set point from the cached state."""
+        target = int(round(target))
+        async with self._command_lock:
+            current = read_back()
+            steps = target - current
+            if steps == 0:
+                return current
+
+            inc_dec = (TEMPERATURE_INCREMENT if steps > 0 else TEMPERATURE_DECREMENT)
+            command = command_format(inc_dec)
+            _LOGGER.debug(f"[Vzduch] step_set_point from {current} to {target} in {abs(steps)} steps")
+            pending = []
+            for step in range(abs(steps)):
+                if step > 0 and self._step_delay:
+                    await asyncio.sleep(self._step_delay)
+                pending.append(asyncio.ensure_future(self.prep_fetch(HTTP_POST, command)))
+            # Every step is awaited, even after one fails, so none is still in flight when the lock is released
+            responses = await asyncio.gather(*pending, return_exceptions=True)
+            errors = [response for response in responses if isinstance(response, BaseException)]
+            replies = [response for response in responses if response is not None and not isinstance(response, BaseException)]
+            if replies:
+                await self.async_set_properties(replies[-1])
+
+            if errors or read_back() != target:
+                _LOGGER.debug(f"[Vzduch] step_set_point {len(errors)} failed steps, reply at {read_back()}, reading state to confirm")
+                response = await self.prep_fetch(HTTP_GET, GET_VZDUCH_INFO)
+                await self.async_set_properties(response)
+            if read_back() != target:
+                _LOGGER.warning(f"[Vzduch] Set point did not converge. Wanted {target} have {read_back()}")
+                if errors:
+                    raise errors[0]
+        return read_back()
+
+class VzduchAirconState(namedtuple("VzduchAirconState", [field for field, _ in AC_FIELDS] + ["zones", "sensors"])):
+    """Immutable snapshot of an aircon, its zones and its sensors, taken from one response.
+    zones and sensors are tuples in server order"""
+    __slots__ = ()
+
+class Vzduch_Aircon:
+    """ An aircon served by a Vzduch.Dotek Net server.
+    The state is held as an immutable VzduchAirconState that is replaced as a whole after each
+    parse or optimistic write, so readers always see one consistent snapshot"""
+    def __init__(self, api, ac_id):
+        self._api = api
+        self._id = ac_id
+        self._state = EMPTY_AIRCON_STATE
+        self._previous_state = EMPTY_AIRCON_STATE
+        # Id lookups into the current snapshot, rebuilt by _swap when its zones or sensors change
+        self._zones_by_id = {}
+        self._sensors_by_id = {}
+        self._sensor_zone_ids = {}
+        self._sensor_trends = {}
+        self._zone_trends = {}
+
+    def update(self, aircon_data, changed_fields, changed_zones, changed_sensors):
+        """Build a new snapshot from the response and swap it in, adding (aircon id, key) pairs
+        of what changed to the given sets. Zones and sensors that did not change are reused"""
+        previous = self._state
+        previous_zones = self._zones_by_id
+        previous_sensors = self._sensors_by_id
+        zones = []
+        sensors = []
+        for zone_data in aircon_data["zones"]:
+            zone_sensors = []
+            for sensor_data in zone_data["sensors"]:
+                sensor = Vzduch_Sensor.from_data(sensor_data)
+                previous_sensor = previous_sensors.get(sensor.id)
+                if sensor == previous_sensor:
+                    sensor = previous_sensor
+                else:
+                    changed_sensors.add((self._id, sensor.id))
+                zone_sensors.append(sensor)
+            zone = Vzduch_Zone.from_data(zone_data, tuple(zone_sensors))
+            previous_zone = previous_zones.get(zone.id)
+            if zone == previous_zone:
+                zone = previous_zone
+            elif previous_zone is None or zone[:-1] != previous_zone[:-1]:
+                # Sensor readings are reported as sensor changes, not zone changes
+                changed_zones.add((self._id, zone.id))
+            zones.append(zone)
+            sensors.extend(zone_sensors)
+
+        state = VzduchAirconState(*[aircon_data[key] for _, key in AC_FIELDS], tuple(zones), tuple(sensors))
+        for index, (field, _) in enumerate(AC_FIELDS):
+            if state[index] != previous[index]:
+                changed_fields.add((self._id, field))
+        self._swap(state)
+
+    def record_trends(self, timestamp):
+        """Add each available sensor reading, and each zone's average of them, to the trend buffers"""
+        for zone in self._state.zones:
+            readings = []
+            for sensor in zone.sensors:
+                if not sensor.is_available or sensor.temperature is None:
+                    continue
+                readings.append(sensor.temperature)
+                trend = self._sensor_trends.get(sensor.id)
+                if trend is None:
+                    trend = self._sensor_trends[sensor.id] = TemperatureTrend()
+                trend.add(timestamp, sensor.temperature)
+            if readings:
+                trend = self._zone_trends.get(zone.id)
+                if trend is None:
+                    trend = self._zone_trends[zone.id] = TemperatureTrend()
+                trend.add(timestamp, sum(readings) / len(readings))
+
+    def _swap(self, state):
+        """Make state the current snapshot, keeping the one it replaces"""
+        previous = self._state
+        self._previous_state = previous
+        self._state = state
+        if state.zones is not previous.zones:
+            self._zones_by_id = {zone.id: zone for zone in state.zones}
+        if state.sensors is not previous.sensors:
+            self._sensors_by_id = {sensor.id: sensor for sensor in state.sensors}
+            self._sensor_zone_ids = {sensor.id: zone.id for zone in state.zones for sensor in zone.sensors}
+
+    def assume(self, field, value):
+        """Set an aircon field ahead of the server confirming it"""
+        self._swap(self._state._replace(**{field: value}))
+        self._api.assume_changed(field=(self._id, field))
+
+    def assume_zone(self, zone_id, field, value):
+        """Set a zone field ahead of the server confirming it"""
+        zones = tuple(
+            zone._replace(**{field: value}) if zone.id == zone_id else zone
+            for zone in self._state.zones)
+        self._swap(self._state._replace(zones=zones))
+        self._api.assume_changed(zone=(self._id, zone_id))
+
+    @property
+    def state(self):
+        """Return the current snapshot"""
+        return self._state
+
+    @property
+    def previous_state(self):
+        """Return the snapshot the current one replaced"""
+        return self._previous_state
+
+    @property
+    def id(self):
+        """Return the id (position) of the aircon on the server."""
+        return self._id
+
+    @property
+    def available(self) -> bool:
+        """Return True if the server is available."""
+        return self._api.available
+
+    @property
+    def device_info(self):
+        """Return a device description for device registry."""
+        return {
+            "manufacturer": "Polyaire",
+            "model": "AirTouch 3",
+            "name": self._state.name
+        }
+
     @property
     def power(self):
         """Return the power status of the aircon unit."""
-        return self._power
+        return self._state.power
 
     @property
     def name(self):
         """Return the given name of the aircon unit"""
-        return self._name
+        return self._state.name
 
     @property
     def error_status(self):
         """Return the error status of the aircon unit."""
-        return self._status
+        return self._state.status
 
     @property
     def mode(self):
         """Return the current mode of the aircon unit (heat, cool etc)."""
-        return self._mode
+        return self._state.mode
 
     @property
     def fan_mode(self):
         """Return the current fan mode of the aircon unit (low, medium, high)."""
-        return self._fan_mode
+        return self._state.fan_mode
 
     @property
     def thermostat_mode(self):
         """Return the current thermostat mode."""
-        return self._thermostat_mode
+        return self._state.thermostat_mode
 
     @property
     def thermostat_mode_desc(self):
@@ -247,7 +774,7 @@ class Vzduch:
         elif self.thermostat_mode == (2 + len(self.zones)):
             return THERMOSTAT_MODE_AUTO
         else:
-            temperature_zone = self.zones[len(self.zones) - 1]
+            temperature_zone = self.temperature_zone
             if temperature_zone.status == 1: # Is ON
                 return THERMOSTAT_MODE_ZONE
             else:
@@ -256,67 +783,187 @@ class Vzduch:
     @property
     def airtouch_id(self):
         """Return the airtouch_id."""
-        return self._airtouch_id
+        return self._state.airtouch_id
 
     @property
     def touch_pad_temperature(self):
         """Return the temperature of where the touchpad is."""
-        return self._touch_pad_temperature
+        return self._state.touch_pad_temperature
 
     @property
     def room_temperature(self):
         """Return the temperature of the main room."""
-        return self._room_temperature
+        return self._state.room_temperature
 
     @property
     def desired_temperature(self):
         """Return the desired temperature (Set Temperature)"""
-        return self._desired_temperature
+        return self._state.desired_temperature
 
     @property
     def zones(self):
-        """Return the zones created for this aircon"""
-        return self._zones
+        """Return the zones of this aircon"""
+        return self._state.zones
 
     @property
     def sensors(self):
-        """Return the sensors created for this aircon"""
-        return self._sensors
+        """Return the sensors of this aircon"""
+        return self._state.sensors
+
+    @property
+    def temperature_zone(self):
+        """Return the zone used for the zone thermostat mode (the last zone)"""
+        zones = self._state.zones
+        return zones[-1] if zones else None
+
+    def zone(self, zone_id):
+        """Return the zone with the given id, or None"""
+        return self._zones_by_id.get(zone_id)
+
+    def sensor(self, sensor_id):
+        """Return the sensor with the given id, or None"""
+        return self._sensors_by_id.get(sensor_id)
+
+    def sensor_zone(self, sensor_id):
+        """Return the zone the sensor with the given id is in, or None"""
+        return self._zones_by_id.get(self._sensor_zone_ids.get(sensor_id))
+
+    def zone_set_point(self, zone):
+        """Return the set point a zone is heading to. Zones that are not temperature
+        controlled follow the aircon set point"""
+        return zone.desired_temperature or self._state.desired_temperature
+
+    def sensor_trend(self, sensor_id):
+        """Return the TemperatureTrend of a sensor, or None before its first reading"""
+        return self._sensor_trends.get(sensor_id)
+
+    def zone_trend(self, zone_id):
+        """Return the TemperatureTrend of a zone's average sensor reading, or None"""
+        return self._zone_trends.get(zone_id)
+
+    def scene(self):
+        """Return the settings restore_scene can bring back, as plain data"""
+        state = self._state
+        return {
+            "power": state.power,
+            "mode": state.mode,
+            "fan_mode": state.fan_mode,
+            "desired_temperature": state.desired_temperature,
+            "zones": [
+                {
+                    "id": zone.id,
+                    "status": zone.status,
+                    "damper": zone.fan_value,
+                    "desired_temperature": zone.desired_temperature,
+                }
+                for zone in state.zones
+            ],
+        }
+
+    async def restore_scene(self, scene):
+        """Bring the aircon back to a scene from scene() with as few commands as possible.
+        Settings that already match are skipped, the switches and dampers that differ are sent
+        as one batch, then set points are stepped to their saved values.
+        Returns the number of settings changed"""
+        power = scene["power"]
+        waiters = []
+        if power == AC_POWER_ON:
+            waiters.append(self.queue_power_switch(power))
+        waiters.append(self.queue_mode(scene["mode"]))
+        waiters.append(self.queue_fan_mode(scene["fan_mode"]))
+        if power != AC_POWER_ON:
+            waiters.append(self.queue_power_switch(power))
+        for zone_scene in scene["zones"]:
+            if self.zone(zone_scene["id"]) is None:
+                continue
+            waiters.append(self.queue_zone_switch(zone_scene["id"], zone_scene["status"]))
+            waiters.append(self.queue_zone_damper(zone_scene["id"], zone_scene["damper"]))
+        waiters = [waiter for waiter in waiters if waiter is not None]
+        if waiters:
+            self._api.commands.flush_now()
+            await asyncio.gather(*waiters)
+        changed = len(waiters)
+
+        if scene["desired_temperature"] and scene["desired_temperature"] != self.desired_temperature:
+            await self.set_temperature(scene["desired_temperature"])
+            changed += 1
+        for zone_scene in scene["zones"]:
+            zone = self.zone(zone_scene["id"])
+            if (zone is not None and zone.desired_temperature and zone_scene["desired_temperature"]
+                    and zone.desired_temperature != zone_scene["desired_temperature"]):
+                await self.set_zone_temperature(zone.id, zone_scene["desired_temperature"])
+                changed += 1
+        _LOGGER.debug(f"[Vzduch] restore_scene changed {changed} settings of aircon {self._id}")
+        return changed
+
+    def _queue(self, key, command, value, read, write):
+        """Queue a command unless the cached state already has value and nothing is queued for key.
+        Returns a future done once the command is reconciled, or None"""
+        if read() == value and not self._api.commands.is_pending(key):
+            return None
+        return self._api.commands.enqueue(key, command, value, read, write)
 
     async def power_switch(self, to_state):
         """Switch unit on / off"""
+        waiter = self.queue_power_switch(to_state)
+        if waiter is not None:
+            await waiter
+
+    def queue_power_switch(self, to_state):
+        """Queue switching the unit on / off"""
         _LOGGER.debug(f"[Vzduch] power_switch to_state {to_state}")
-        command = POST_POWER_SWITCH.format(self._selected_ac, to_state)
-        response = await self.prep_fetch(HTTP_POST, command)
-        self.set_properties(response)
+        return self._queue(
+            (self._id, FIELD_POWER, None),
+            POST_POWER_SWITCH.format(self._id, to_state),
+            to_state,
+            lambda: self.power,
+            lambda value: self.assume("power", value))
 
     async def set_mode(self, to_mode):
         """Set the AC Mode (Heat / Cool, etc)"""
+        waiter = self.queue_mode(to_mode)
+        if waiter is not None:
+            await waiter
+
+    def queue_mode(self, to_mode):
+        """Queue setting the AC Mode"""
         _LOGGER.debug(f"[Vzduch] set_mode to_mode {to_mode}")
-        command = POST_AC_MODE.format(self._selected_ac , to_mode)
-        response = await self.prep_fetch(HTTP_POST, command)
-        self.set_properties(response)
+        return self._queue(
+            (self._id, FIELD_MODE, None),
+            POST_AC_MODE.format(self._id , to_mode),
+            to_mode,
+            lambda: self.mode,
+            lambda value: self.assume("mode", value))
 
     async def set_fan_mode(self, to_mode):
         """Set the AC Fan Mode (Low / Med, High)"""
+        waiter = self.queue_fan_mode(to_mode)
+        if waiter is not None:
+            await waiter
+
+    def queue_fan_mode(self, to_mode):
+        """Queue setting the AC Fan Mode"""
         _LOGGER.debug(f"[Vzduch] set_fan_mode to_mode {to_mode}")
-        command = POST_AC_FAN_MODE.format(self._selected_ac, to_mode)
-        response = await self.prep_fetch(HTTP_POST, command)
-        self.set_properties(response)
+        return self._queue(
+            (self._id, FIELD_FAN_MODE, None),
+            POST_AC_FAN_MODE.format(self._id, to_mode),
+            to_mode,
+            lambda: self.fan_mode,
+            lambda value: self.assume("fan_mode", value))
 
     async def set_temperature(self, to_temperature):
         """Set the desired temperature"""
         _LOGGER.debug(f"[Vzduch] set_temperature to_temperature {to_temperature} current desired {self.desired_temperature}")
-        inc_dec = (TEMPERATURE_INCREMENT if to_temperature >= self.desired_temperature else TEMPERATURE_DECREMENT)
-        command = POST_AC_TEMPERATURE.format(self._selected_ac, inc_dec)
-        response = await self.prep_fetch(HTTP_POST, command)
-        self.set_properties(response)
+        return await self._api.step_set_point(
+            lambda inc_dec: POST_AC_TEMPERATURE.format(self._id, inc_dec),
+            to_temperature,
+            lambda: self.desired_temperature)
 
     async def set_temperature_thermostat_mode(self, to_temperature):
         """Set the desired temperature"""
         _LOGGER.debug(f"[Vzduch] set_temperature_thermostat_mode to_temperature {to_temperature}")
         if self.thermostat_mode_desc == THERMOSTAT_MODE_ZONE:
-            temperature_zone = self.zones[len(self.zones) - 1]
+            temperature_zone = self.temperature_zone
             if temperature_zone is not None:
                 await self.set_zone_temperature(temperature_zone.id, to_temperature)
             else:
@@ -325,134 +972,387 @@ class Vzduch:
             await self.set_temperature(to_temperature)
 
     async def zone_toggle(self, zone_id):
-        """Switch zone on / off"""
+        """Switch zone on / off. The toggle is queued as an explicit switch against the
+        cached zone status (which already holds any queued switch), so repeated toggles coalesce"""
         _LOGGER.debug(f"[Vzduch] zone_toggle zone_id {zone_id}")
-        command = POST_ZONE_TOGGLE.format(self._selected_ac, zone_id)
-        response = await self.prep_fetch(HTTP_POST, command)
-        self.set_properties(response)
+        selected_zone = self.zone(zone_id)
+        if selected_zone is None:
+            _LOGGER.warning(f"[Vzduch] Selected Zone with Id {zone_id} not found")
+            return
+
+        await self.zone_switch(zone_id, ZONE_OFF if selected_zone.status == ZONE_ON else ZONE_ON)
 
     async def zone_switch(self, zone_id, to_state):
         """Switch zone on / off"""
+        waiter = self.queue_zone_switch(zone_id, to_state)
+        if waiter is not None:
+            await waiter
+
+    def queue_zone_switch(self, zone_id, to_state):
+        """Queue a zone switch unless the zone already has to_state.
+        Returns a future done once the command is reconciled, or None"""
         _LOGGER.debug(f"[Vzduch] zone_switch zone_id {zone_id}  to_state {to_state}")
-        command = POST_ZONE_SWITCH.format(self._selected_ac, zone_id, to_state)
-        response = await self.prep_fetch(HTTP_POST, command)
-        self.set_properties(response)
+        selected_zone = self.zone(zone_id)
+        if selected_zone is None:
+            _LOGGER.warning(f"[Vzduch] Selected Zone with Id {zone_id} not found")
+            return None
+
+        return self._queue(
+            (self._id, FIELD_ZONE_STATUS, zone_id),
+            POST_ZONE_SWITCH.format(self._id, zone_id, to_state),
+            to_state,
+            lambda: self.zone(zone_id).status,
+            lambda value: self.assume_zone(zone_id, "status", value))
 
     async def set_zone_temperature(self, zone_id, to_temperature):
-        """Set the desired temperature for a given zone"""
+        """Set the desired temperature for a given zone. Returns the zone desired temperature,
+        which is 0 for a zone that is not temperature controlled"""
         _LOGGER.debug(f"[Vzduch] set_zone_temperature to_temperature {to_temperature}")
-        selected_zone = self.zones[zone_id]
+        selected_zone = self.zone(zone_id)
         if selected_zone is None:
             _LOGGER.warning(f"[Vzduch] Selected Zone with Id {zone_id} not found")
             return
 
         _LOGGER.debug(f"[Vzduch] Zone with Id {zone_id} current desired temperature {selected_zone.desired_temperature}")
-        inc_dec = (TEMPERATURE_INCREMENT if to_temperature >= selected_zone.desired_temperature else TEMPERATURE_DECREMENT)
-        command = POST_ZONE_TEMPERATURE.format(self._selected_ac, zone_id, inc_dec)
-        response = await self.prep_fetch(HTTP_POST, command)
-        self.set_properties(response)
-        return selected_zone.desired_temperature
+        if selected_zone.desired_temperature == 0:
+            return 0
+        return await self._api.step_set_point(
+            lambda inc_dec: POST_ZONE_TEMPERATURE.format(self._id, zone_id, inc_dec),
+            to_temperature,
+            lambda: self.zone(zone_id).desired_temperature)
 
     async def set_zone_damper(self, zone_id, percentage):
         """Set the desired damper percentage for a given zone"""
+        waiter = self.queue_zone_damper(zone_id, percentage)
+        if waiter is not None:
+            await waiter
+        selected_zone = self.zone(zone_id)
+        return selected_zone.fan_value if selected_zone is not None else None
+
+    def queue_zone_damper(self, zone_id, percentage):
+        """Queue a damper change unless the zone damper is already at percentage.
+        Returns a future done once the command is reconciled, or None"""
         _LOGGER.debug(f"[Vzduch] set_zone_damper percentage {percentage}")
-        selected_zone = self.zones[zone_id]
+        selected_zone = self.zone(zone_id)
         if selected_zone is None:
             _LOGGER.warning(f"[Vzduch] Selected Zone with Id {zone_id} not found")
-            return
-
-        command = POST_ZONE_DAMPER.format(self._selected_ac, zone_id, percentage)
-        response = await self.prep_fetch(HTTP_POST, command)
-        self.set_properties(response)
-        return selected_zone.fan_value
-
-class Vzduch_Zone:
-    """ A Zone """
-    def __init__(self, zone_data):
-        self._id = zone_data["id"]
-        self._name = zone_data["name"]
-        self.update(zone_data)
-
-    def update(self, zone_data):
-        """Once a zone is created a subset of its properties are kept up to date"""
-        self._status = zone_data["status"]
-        self._fan_value = zone_data["fanValue"]
-        self._is_spill = zone_data["isSpill"]
-        self._desired_temperature = zone_data["desiredTemperature"]
-        self._zone_temperature_type = zone_data["zoneTemperatureType"]
-        self._sensors = []
-        for sensor_data in zone_data["sensors"]:
-            sensor = Vzduch_Sensor(sensor_data)
-            self._sensors.append(sensor)
-
-    @property
-    def id(self):
-        """Returns the id for the zone"""
-        return self._id
-
-    @property
-    def name(self):
-        """Returns the name for the zone"""
-        return self._name
+            return None
+
+        return self._queue(
+            (self._id, FIELD_ZONE_DAMPER, zone_id),
+            POST_ZONE_DAMPER.format(self._id, zone_id, percentage),
+            percentage,
+            lambda: self.zone(zone_id).fan_value,
+            lambda value: self.assume_zone(zone_id, "fan_value", value))
+
+class CircuitBreaker:
+    """Stops requests to a server that keeps failing.
+
+    After failure_threshold consecutive failures the breaker opens and requests fail fast.
+    Once reset_timeout seconds have passed a single trial request is let through (half open).
+    A success closes the breaker, a failure opens it again."""
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+
+    def allow(self):
+        """Return True if a request may be sent"""
+        if self._opened_at is None:
+            return True
+        if not self._trial and time.monotonic() - self._opened_at >= self._reset_timeout:
+            self._trial = True
+            return True
+        return False
+
+    def record_success(self):
+        """A request succeeded"""
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+
+    def record_failure(self):
+        """A request failed"""
+        self._failures += 1
+        if self._trial or self._failures >= self._failure_threshold:
+            self._opened_at = time.monotonic()
+            self._trial = False
 
     @property
-    def status(self):
-        """Returns the zone status (on / off)"""
-        return self._status
-
-    @property
-    def fan_value(self):
-        """Returns the zone fan value"""
-        return self._fan_value
+    def state(self):
+        """Return the breaker state"""
+        if self._opened_at is None:
+            return BREAKER_CLOSED
+        return BREAKER_HALF_OPEN if self._trial else BREAKER_OPEN
+
+class TemperatureTrend:
+    """The last TREND_SAMPLES temperature readings in array backed ring buffers.
+
+    The rolling mean is kept as a running sum and the rate of change is taken between the
+    oldest and newest sample, so adding a sample and reading the trend are both O(1)."""
+
+    def __init__(self, size=TREND_SAMPLES):
+        self._size = size
+        self._times = array("d", [0.0]) * size
+        self._values = array("d", [0.0]) * size
+        self._count = 0
+        self._next = 0
+        self._sum = 0.0
+
+    def __len__(self):
+        return self._count
+
+    def add(self, timestamp, value):
+        """Add a reading taken at timestamp (seconds, monotonic), replacing the oldest once full"""
+        if self._count == self._size:
+            self._sum -= self._values[self._next]
+        else:
+            self._count += 1
+        self._times[self._next] = timestamp
+        self._values[self._next] = value
+        self._sum += value
+        self._next = (self._next + 1) % self._size
 
     @property
-    def is_spill(self):
-        """Returns whether the zone is used as spill"""
-        return self._is_spill
+    def latest(self):
+        """Return the newest reading, or None"""
+        if not self._count:
+            return None
+        return self._values[self._next - 1]
 
     @property
-    def desired_temperature(self):
-        """Returns the zone desired temperature"""
-        return self._desired_temperature
+    def mean(self):
+        """Return the mean of the buffered readings, or None"""
+        if not self._count:
+            return None
+        return self._sum / self._count
 
     @property
-    def zone_temperature_type(self):
-        """Returns how the temperature is calculated or used within the zone"""
-        return self._zone_temperature_type
+    def rate(self):
+        """Return the rate of change in degrees per hour, or None with less than two readings"""
+        if self._count < 2:
+            return None
+        oldest = (self._next - self._count) % self._size
+        elapsed = self._times[self._next - 1] - self._times[oldest]
+        if elapsed <= 0:
+            return None
+        return (self._values[self._next - 1] - self._values[oldest]) * 3600 / elapsed
+
+    def time_to(self, target):
+        """Return the minutes until target is reached at the current rate. None if the
+        temperature is steady or moving away from target"""
+        latest = self.latest
+        if latest is None:
+            return None
+        remaining = target - latest
+        if remaining == 0:
+            return 0
+        rate = self.rate
+        if not rate or (remaining > 0) != (rate > 0):
+            return None
+        return remaining * 60 / rate
+
+# A command waiting in the queue. confirmed is the server value before the first queued write,
+# read and write get and set the cached value
+QueuedCommand = namedtuple("QueuedCommand", ["command", "value", "confirmed", "read", "write", "waiters"])
+
+class VzduchCommandQueue:
+    """Coalesces writes to a Vzduch unit.
+
+    Commands are keyed by (aircon, field, zone). The expected effect is applied to the cached
+    state straight away so entities update without waiting for the server. Within the window a
+    later write to the same key replaces the earlier one. When the window closes, commands that
+    would not change the confirmed state are dropped and the rest are sent. Aircon level commands
+    go first and in order, then zone commands, up to concurrency at a time since they do not
+    depend on each other. Only the last reply is parsed, or when zone commands went out together
+    the state is read once after all of them. That confirms the expected effects; anything it does
+    not confirm is reported as rejected, and if no reply arrives the cached state is rolled back."""
+
+    def __init__(self, api, window, concurrency = 1):
+        self._api = api
+        self._window = window
+        self._concurrency = max(1, concurrency)
+        self._pending = OrderedDict()
+        self._flush_task = None
+        self._submitted = 0
+        self._coalesced = 0
+        self._dropped = 0
+        self._sent = 0
+        self._batches = 0
+        self._rejected = 0
 
     @property
-    def sensors(self):
-        """Returns all sensors registered in the zone"""
-        return self._sensors
+    def has_pending(self):
+        """Return True if commands are waiting for the window to close"""
+        return bool(self._pending)
+
+    def is_pending(self, key):
+        """Return True if a command for key is waiting for the window to close"""
+        return key in self._pending
+
+    def pending_value(self, key, default=None):
+        """Return the value queued for key, or default if nothing is queued"""
+        queued = self._pending.get(key)
+        return default if queued is None else queued.value
+
+    async def submit(self, key, command, value, read, write):
+        """Queue a command, apply its effect to the cached state and wait until the batch
+        it ends up in has been sent and reconciled"""
+        await self.enqueue(key, command, value, read, write)
+
+    def enqueue(self, key, command, value, read, write):
+        """Queue a command and apply its effect to the cached state. Returns a future
+        that is done once the batch it ends up in has been sent and reconciled"""
+        self._submitted += 1
+        waiter = asyncio.get_event_loop().create_future()
+        queued = self._pending.pop(key, None)
+        if queued is not None:
+            self._coalesced += 1
+            confirmed = queued.confirmed
+            waiters = queued.waiters
+        else:
+            confirmed = read()
+            waiters = []
+        waiters.append(waiter)
+        self._pending[key] = QueuedCommand(command, value, confirmed, read, write, waiters)
+        if read() != value:
+            write(value)
+            self._api.notify_state_changed()
+        if self._flush_task is None:
+            self._flush_task = asyncio.ensure_future(self._flush_later(self._window))
+        return waiter
+
+    def flush_now(self):
+        """Close the window early and send the queued commands"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+        self._flush_task = asyncio.ensure_future(self._flush_later(0))
+
+    async def _flush_later(self, delay):
+        """Wait for the window to close, then send the batch"""
+        await asyncio.sleep(delay)
+        self._flush_task = None
+        batch = self._pending
+        self._pending = OrderedDict()
+        async with self._api.command_lock:
+            await self._flush(batch)
+
+    def _roll_back(self, batch):
+        """No reply arrived: put the confirmed values back and report the commands as rejected"""
+        for key, queued in batch.items():
+            if queued.value != queued.confirmed:
+                queued.write(queued.confirmed)
+                self._rejected += 1
+                self._api.command_rejected(key, queued.value, queued.confirmed)
+        self._api.notify_state_changed()
+
+    async def _flush(self, batch):
+        """Send the commands of the batch that change state, then reconcile against the last reply"""
+        self._batches += 1
+        try:
+            aircon_commands = []
+            zone_commands = []
+            for key, queued in batch.items():
+                if queued.value == queued.confirmed:
+                    self._dropped += 1
+                elif key[2] is None:
+                    aircon_commands.append(queued.command)
+                else:
+                    zone_commands.append(queued.command)
+            replies = []
+            for command in aircon_commands:
+                replies.append(await self._api.prep_fetch(HTTP_POST, command))
+            if self._concurrency > 1 and len(zone_commands) > 1:
+                replies.extend(await self._send_concurrently(zone_commands))
+                # Replies to commands sent together may arrive in any order
+                replies.append(await self._api.prep_fetch(HTTP_GET, GET_VZDUCH_INFO))
+            else:
+                for command in zone_commands:
+                    replies.append(await self._api.prep_fetch(HTTP_POST, command))
+            sent = len(aircon_commands) + len(zone_commands)
+            response = next((reply for reply in reversed(replies) if reply is not None), None)
+            _LOGGER.debug(f"[Vzduch] Flushed command batch. Sent {sent} of {len(batch)}")
+            self._sent += sent
+            if sent and response is None:
+                self._roll_back(batch)
+            elif sent:
+                await self._api.async_set_properties(response)
+                for key, queued in batch.items():
+                    if queued.value != queued.confirmed and queued.read() != queued.value:
+                        self._rejected += 1
+                        self._api.command_rejected(key, queued.value, queued.read())
+        except Exception as error:  # pylint: disable=broad-except
+            self._roll_back(batch)
+            for queued in batch.values():
+                for waiter in queued.waiters:
+                    if not waiter.done():
+                        waiter.set_exception(error)
+            return
 
-class Vzduch_Sensor:
-    """ A Sensor in a Zone """
-    def __init__(self, sensor_data):
-        self._id = sensor_data["id"]
-        self._is_available = sensor_data["isAvailable"]
-        self.update(sensor_data)
+        for queued in batch.values():
+            for waiter in queued.waiters:
+                if not waiter.done():
+                    waiter.set_result(None)
 
-    def update(self, sensor_data):
-        """Once a sensor is created a subset of its properties are kept up to date"""
-        self._is_low_battery = sensor_data["isLowBattery"]
-        self._temperature = sensor_data["temperature"]
+    async def _send_concurrently(self, commands):
+        """Send commands, up to concurrency at a time. Returns the replies in command order"""
+        semaphore = asyncio.Semaphore(self._concurrency)
 
-    @property
-    def id(self):
-        """Returns the id for the sensor"""
-        return self._id
+        async def send(command):
+            async with semaphore:
+                return await self._api.prep_fetch(HTTP_POST, command)
 
-    @property
-    def is_available(self):
-        """Return whether the sensor is available or not"""
-        return self._is_available
+        replies = await asyncio.gather(*[send(command) for command in commands], return_exceptions=True)
+        for reply in replies:
+            if isinstance(reply, BaseException):
+                raise reply
+        return replies
 
     @property
-    def is_low_battery(self):
-        """Return the battery status for the sensor"""
-        return self._is_low_battery
+    def stats(self):
+        """Return the queue counters"""
+        return {
+            "commands_submitted": self._submitted,
+            "commands_coalesced": self._coalesced,
+            "commands_dropped": self._dropped,
+            "commands_sent": self._sent,
+            "command_batches": self._batches,
+            "commands_rejected": self._rejected,
+        }
 
-    @property
-    def temperature(self):
-        """Return the temperature for the sensor"""
-        return self._temperature
\ No newline at end of file
+class Vzduch_Zone(namedtuple("Vzduch_Zone", [
+        "id", "name", "status", "fan_value", "is_spill", "desired_temperature", "zone_temperature_type", "sensors"])):
+    """ A Zone. An immutable snapshot, sensors is a tuple of Vzduch_Sensor """
+    __slots__ = ()
+
+    @classmethod
+    def from_data(cls, zone_data, sensors):
+        """Create a zone from its part of the response"""
+        return cls(
+            zone_data["id"],
+            zone_data["name"],
+            zone_data["status"],
+            zone_data["fanValue"],
+            zone_data["isSpill"],
+            zone_data["desiredTemperature"],
+            zone_data["zoneTemperatureType"],
+            sensors)
+
+class Vzduch_Sensor(namedtuple("Vzduch_Sensor", ["id", "is_available", "is_low_battery", "temperature"])):
+    """ A Sensor in a Zone. An immutable snapshot """
+    __slots__ = ()
+
+    @classmethod
+    def from_data(cls, sensor_data):
+        """Create a sensor from its part of the response"""
+        return cls(
+            sensor_data["id"],
+            sensor_data["isAvailable"],
+            sensor_data["isLowBattery"],
+            sensor_data["temperature"])
+
+EMPTY_AIRCON_STATE = VzduchAirconState(
+    AC_POWER_OFF, '', AC_STATUS_OK, AC_MODE_AUTO, AC_FAN_MODE_LOW, 0, '', 0, 0, 0, (), ())
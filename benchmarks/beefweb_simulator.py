@@ -0,0 +1,289 @@
+"""Local simulator of a foobar2000 beefweb server.
+
+Implements the endpoints used by foobar2k/foobar2k.py: the player, playlists, playlist items
+and the query/updates event stream, with a configurable number of playlists and tracks and
+injected latency.
+
+    python benchmarks/beefweb_simulator.py --playlists 3 --tracks 40 --latency 0.01
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from aiohttp import web
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8880
+
+
+class BeefwebSimulator:
+    """A beefweb server playing through in memory playlists.
+
+    The position of the active track advances with the clock while playing. Every change made
+    through the API is pushed to the open event streams."""
+
+    def __init__(self, playlists=2, tracks=20, duration=180.0, latency=0.0):
+        self.latency = latency
+        self.requests = 0
+        self.gets = 0
+        self.posts = 0
+        self.item_gets = 0
+        self.events = 0
+        self._runner = None
+        self._streams = []
+        self.playlists = [
+            {
+                "id": f"p{pl}",
+                "title": f"Playlist {pl}",
+                "isCurrent": pl == 0,
+                "tracks": [
+                    {
+                        "%artist%": f"Artist {pl}.{index // 10}",
+                        "%title%": f"Title {pl}.{index}",
+                        "%track%": str(index % 10 + 1),
+                        "%album%": f"Album {pl}.{index // 10}",
+                        "%path%": f"C:\\Music\\{pl}\\{index}.flac",
+                        "duration": duration,
+                    }
+                    for index in range(tracks)
+                ],
+            }
+            for pl in range(playlists)
+        ]
+        self.playlist = 0
+        self.index = 0
+        self.state = "playing"
+        self.mode = 0
+        self.volume = -10.0
+        self.muted = False
+        self._position = 0.0
+        self._position_at = time.monotonic()
+
+    @property
+    def position(self):
+        """Position of the active track in seconds"""
+        if self.state == "playing":
+            return self._position + time.monotonic() - self._position_at
+        return self._position
+
+    def seek(self, position):
+        """Move the active track to position seconds"""
+        self._position = position
+        self._position_at = time.monotonic()
+
+    def _track(self, playlist=None, index=None):
+        playlist = self.playlist if playlist is None else playlist
+        index = self.index if index is None else index
+        return self.playlists[playlist]["tracks"][index]
+
+    def player(self, columns=()):
+        """Return the player object of GET /api/player"""
+        active = {
+            "playlistId": self.playlists[self.playlist]["id"],
+            "playlistIndex": self.playlist,
+            "index": self.index if self.state != "stopped" else -1,
+            "position": round(self.position, 3) if self.state != "stopped" else 0,
+            "duration": self._track()["duration"] if self.state != "stopped" else 0,
+            "columns": [self._track()[column] for column in columns] if self.state != "stopped" else [],
+        }
+        return {
+            "info": {"name": "foobar2000", "title": "foobar2000", "version": "1.6", "pluginVersion": "0.5"},
+            "activeItem": active,
+            "playbackState": self.state,
+            "playbackMode": self.mode,
+            "playbackModes": ["Default", "Repeat (playlist)", "Repeat (track)", "Random",
+                              "Shuffle (tracks)", "Shuffle (albums)", "Shuffle (folders)"],
+            "volume": {"type": "db", "min": -100.0, "max": 0.0, "value": self.volume, "isMuted": self.muted},
+        }
+
+    def playlists_payload(self):
+        """Return the playlists list of GET /api/playlists"""
+        return [
+            {"id": pl["id"], "index": index, "title": pl["title"], "isCurrent": index == self.playlist,
+             "itemCount": len(pl["tracks"]), "totalTime": sum(track["duration"] for track in pl["tracks"])}
+            for index, pl in enumerate(self.playlists)
+        ]
+
+    def app(self):
+        """Return the aiohttp application serving the simulator"""
+        app = web.Application(middlewares=[self._inject])
+        router = app.router
+        router.add_get("/api/player", self._get_player)
+        router.add_post("/api/player", self._set_player)
+        router.add_post("/api/player/play", self._command("play"))
+        router.add_post("/api/player/stop", self._command("stop"))
+        router.add_post("/api/player/next", self._command("next"))
+        router.add_post("/api/player/previous", self._command("previous"))
+        router.add_post("/api/player/pause", self._command("pause"))
+        router.add_post("/api/player/pause/toggle", self._command("toggle"))
+        router.add_post("/api/player/play/{playlist}/{index}", self._play_item)
+        router.add_get("/api/playlists", self._get_playlists)
+        router.add_get("/api/playlists/{playlist}/items/{range}", self._get_items)
+        router.add_get("/api/query/updates", self._updates)
+        return app
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """Start serving on host:port"""
+        self._runner = web.AppRunner(self.app())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+
+    async def stop(self):
+        """Stop serving"""
+        for queue in self._streams:
+            queue.put_nowait(None)
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def push(self, player=True, playlists=False):
+        """Send a player and/or playlists event to every open stream"""
+        for queue in self._streams:
+            queue.put_nowait((player, playlists))
+
+    @web.middleware
+    async def _inject(self, request, handler):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return await handler(request)
+
+    @staticmethod
+    def _columns(request, body=None):
+        if "columns" in request.query:
+            return request.query["columns"].split(",")
+        if body:
+            return json.loads(body).get("columns", [])
+        return []
+
+    async def _get_player(self, request):
+        self.gets += 1
+        return web.json_response({"player": self.player(self._columns(request))})
+
+    async def _set_player(self, request):
+        self.posts += 1
+        body = await request.json()
+        if "volume" in body:
+            self.volume = float(body["volume"])
+        if "isMuted" in body:
+            self.muted = body["isMuted"]
+        if "position" in body:
+            self.seek(float(body["position"]))
+        if "playbackMode" in body:
+            self.mode = body["playbackMode"]
+        self.push()
+        return web.Response(status=204)
+
+    def _command(self, command):
+        async def handler(request):
+            self.posts += 1
+            count = len(self.playlists[self.playlist]["tracks"])
+            if command == "next":
+                self.index = (self.index + 1) % count
+                self.seek(0)
+            elif command == "previous":
+                self.index = (self.index - 1) % count
+                self.seek(0)
+            elif command == "stop":
+                self.seek(0)
+                self.state = "stopped"
+                self.push()
+                return web.Response(status=204)
+            elif command == "pause" or (command == "toggle" and self.state == "playing"):
+                self.seek(self.position)
+                self.state = "paused"
+                self.push()
+                return web.Response(status=204)
+            if self.state != "playing":
+                self.seek(self._position)
+            self.state = "playing"
+            self.push()
+            return web.Response(status=204)
+        return handler
+
+    async def _play_item(self, request):
+        self.posts += 1
+        playlist = request.match_info["playlist"]
+        for index, pl in enumerate(self.playlists):
+            if pl["id"] == playlist:
+                self.playlist = index
+                break
+        else:
+            raise web.HTTPNotFound()
+        self.index = int(request.match_info["index"])
+        self.state = "playing"
+        self.seek(0)
+        self.push(playlists=True)
+        return web.Response(status=204)
+
+    async def _get_playlists(self, request):
+        self.gets += 1
+        return web.json_response({"playlists": self.playlists_payload()})
+
+    async def _get_items(self, request):
+        self.gets += 1
+        self.item_gets += 1
+        tracks = None
+        for pl in self.playlists:
+            if pl["id"] == request.match_info["playlist"]:
+                tracks = pl["tracks"]
+        if tracks is None:
+            raise web.HTTPNotFound()
+        offset, _, count = request.match_info["range"].partition(":")
+        offset = int(offset)
+        count = int(count) if count else 1
+        columns = self._columns(request, await request.text())
+        return web.json_response({"playlistItems": {
+            "offset": offset,
+            "totalCount": len(tracks),
+            "items": [{"columns": [track[column] for column in columns]} for track in tracks[offset:offset + count]],
+        }})
+
+    async def _updates(self, request):
+        self.gets += 1
+        columns = request.query["trcolumns"].split(",") if "trcolumns" in request.query else []
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        queue = asyncio.Queue()
+        self._streams.append(queue)
+        queue.put_nowait((request.query.get("player") == "true", request.query.get("playlists") == "true"))
+        try:
+            while True:
+                update = await queue.get()
+                if update is None:
+                    break
+                player, playlists = update
+                event = {}
+                if player:
+                    event["player"] = self.player(columns)
+                if playlists:
+                    event["playlists"] = self.playlists_payload()
+                self.events += 1
+                await response.write(f"data: {json.dumps(event)}\n\n".encode())
+        finally:
+            self._streams.remove(queue)
+        return response
+
+
+async def _serve(args):
+    simulator = BeefwebSimulator(playlists=args.playlists, tracks=args.tracks, latency=args.latency)
+    await simulator.start(args.host, args.port)
+    print(f"beefweb simulator on http://{args.host}:{args.port}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await simulator.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--playlists", type=int, default=2)
+    parser.add_argument("--tracks", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,43 @@
+"""Per request latency of a fresh session per request vs the Vzduch keep-alive pool.
+
+Runs the Vzduch simulator locally and times sequential polls.
+
+    python benchmarks/bench_connection_pool.py [requests]
+"""
+import asyncio
+import sys
+
+import aiohttp
+
+from common import load_vzduch, report, time_async
+from vzduch_simulator import VzduchSimulator
+
+HOST = "127.0.0.1"
+PORT = 18899
+
+
+async def main(count):
+    vzduch = load_vzduch()
+    simulator = VzduchSimulator(zones=8)
+    await simulator.start(HOST, PORT)
+    try:
+        async def fresh_session():
+            async with aiohttp.ClientSession() as session:
+                client = vzduch.Vzduch(session, HOST, PORT, 10)
+                await client.prep_fetch(vzduch.HTTP_GET, vzduch.GET_VZDUCH_INFO)
+
+        pooled = vzduch.Vzduch(None, HOST, PORT, 10)
+
+        async def pooled_session():
+            await pooled.prep_fetch(vzduch.HTTP_GET, vzduch.GET_VZDUCH_INFO)
+
+        await pooled_session()
+        report("session per request", await time_async(count, fresh_session))
+        report("keep-alive pool", await time_async(count, pooled_session))
+        await pooled.close()
+    finally:
+        await simulator.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 500))
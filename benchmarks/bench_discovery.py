@@ -0,0 +1,41 @@
+"""Time a subnet scan for Vzduch servers against simulators bound to loopback aliases.
+
+Every 127.0.0.0/8 address reaches the loopback interface on Linux, so simulators are
+started on a few 127.0.0.x addresses and the whole /24 is scanned.
+
+    python benchmarks/bench_discovery.py [servers]
+"""
+import asyncio
+import sys
+import time
+
+from common import load_vzduch
+from vzduch_simulator import VzduchSimulator
+
+NETWORK = "127.0.0.0/24"
+PORT = 18899
+
+
+async def main(count):
+    vzduch = load_vzduch()
+    hosts = [f"127.0.0.{10 + index * 20}" for index in range(count)]
+    simulators = [VzduchSimulator(aircons=1 + index % 2) for index in range(count)]
+    for host, simulator in zip(hosts, simulators):
+        await simulator.start(host, PORT)
+    try:
+        start = time.perf_counter()
+        found = await vzduch.discover_servers(NETWORK, PORT)
+        elapsed = time.perf_counter() - start
+        print(f"Scanned {NETWORK} in {elapsed * 1000:.0f} ms")
+        for server in found:
+            print(f"  {server.host}:{server.port} {', '.join(server.aircons)}")
+        missing = set(hosts) - {server.host for server in found}
+        if missing:
+            print(f"Not found: {', '.join(sorted(missing))}")
+    finally:
+        for simulator in simulators:
+            await simulator.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 3))
@@ -0,0 +1,129 @@
+"""Benchmarks for the Foobar2k client against the local beefweb simulator.
+
+Measures how long a track change takes to reach the client and how many requests it costs,
+polling against following the event stream, the requests spent polling one long track, and
+the error of the reported playback position between polls.
+
+    python benchmarks/bench_foobar2k.py [--interval SECONDS] [--changes N] [--latency SECONDS]
+"""
+import argparse
+import asyncio
+import time
+
+from beefweb_simulator import BeefwebSimulator
+from common import load_foobar2k, report, time_async
+
+HOST = "127.0.0.1"
+PORT = 18880
+
+
+async def bench_track_changes(foobar2k, args, streaming):
+    simulator = BeefwebSimulator(latency=args.latency)
+    await simulator.start(HOST, PORT)
+    client = foobar2k.Foobar2k(None, HOST, PORT, 10)
+    changed = asyncio.Event()
+    client.add_listener(changed.set)
+    poller = None
+    try:
+        await client.async_update()
+        if streaming:
+            client.start_stream()
+            await changed.wait()
+        else:
+            async def poll():
+                while True:
+                    await asyncio.sleep(args.interval)
+                    await client.async_update()
+                    changed.set()
+            poller = asyncio.ensure_future(poll())
+
+        requests = simulator.requests
+        delays = []
+        for _ in range(args.changes):
+            title = simulator.player(["%title%"])["activeItem"]["columns"][0]
+            await asyncio.sleep(args.interval * 0.37)
+            simulator.index = (simulator.index + 1) % len(simulator.playlists[0]["tracks"])
+            simulator.seek(0)
+            simulator.push()
+            start = time.perf_counter()
+            while client.title == title:
+                changed.clear()
+                await changed.wait()
+            delays.append(time.perf_counter() - start)
+
+        # Let a prefetch started by the last change finish before counting idle requests
+        await asyncio.sleep(0.1)
+        requests = simulator.requests - requests
+        idle = simulator.requests
+        await asyncio.sleep(args.interval * 3)
+        idle = (simulator.requests - idle) / (args.interval * 3) * 60
+        name = "event stream" if streaming else f"poll every {args.interval:g}s"
+        print(f"{name:<24} change seen after mean {sum(delays) / len(delays) * 1000:8.1f} ms   "
+              f"max {max(delays) * 1000:8.1f} ms   {requests / args.changes:5.1f} requests per change   "
+              f"{idle:5.1f} requests/min idle")
+    finally:
+        if poller is not None:
+            poller.cancel()
+        await client.close()
+        await simulator.stop()
+
+
+async def bench_polls(foobar2k, args):
+    print(f"Polls while one track plays ({args.polls} polls)")
+    simulator = BeefwebSimulator(latency=args.latency)
+    await simulator.start(HOST, PORT)
+    client = foobar2k.Foobar2k(None, HOST, PORT, 10)
+    try:
+        await client.async_update()
+        requests = simulator.requests
+        report("poll", await time_async(args.polls, client.async_update))
+        print(f"{'':<36} {(simulator.requests - requests) / args.polls:.2f} requests per poll   "
+              f"{client.track_cache_stats}")
+    finally:
+        await client.close()
+        await simulator.stop()
+
+
+async def bench_position(foobar2k, args):
+    print(f"Position error between polls every {args.interval:g}s")
+    simulator = BeefwebSimulator(latency=args.latency)
+    await simulator.start(HOST, PORT)
+    client = foobar2k.Foobar2k(None, HOST, PORT, 10)
+    try:
+        sampled = []
+        interpolated = []
+        resyncs = set()
+        for _ in range(3):
+            await client.async_update()
+            resyncs.add(client.track_position_at)
+            sample = simulator.player()["activeItem"]["position"]
+            for _ in range(10):
+                await asyncio.sleep(args.interval / 10)
+                sampled.append(abs(simulator.position - sample))
+                interpolated.append(abs(simulator.position - client.track_position))
+        print(f"{'last sample':<36} mean error {sum(sampled) / len(sampled) * 1000:8.1f} ms")
+        print(f"{'interpolated':<36} mean error {sum(interpolated) / len(interpolated) * 1000:8.1f} ms   "
+              f"{len(resyncs)} resync over 3 polls")
+    finally:
+        await client.close()
+        await simulator.stop()
+
+
+async def main(args):
+    foobar2k = load_foobar2k()
+    print(f"Track changes ({args.changes} changes, {args.latency * 1000:.0f} ms server latency)")
+    await bench_track_changes(foobar2k, args, streaming=False)
+    await bench_track_changes(foobar2k, args, streaming=True)
+    print()
+    await bench_polls(foobar2k, args)
+    print()
+    await bench_position(foobar2k, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--interval", type=float, default=1.0, help="poll interval in seconds")
+    parser.add_argument("--changes", type=int, default=10)
+    parser.add_argument("--polls", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added by the simulator")
+    asyncio.run(main(parser.parse_args()))
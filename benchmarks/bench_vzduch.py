@@ -0,0 +1,151 @@
+"""Load benchmarks for the Vzduch client against the local simulator.
+
+Measures poll latency, set_properties time against zone and sensor count, and command
+throughput through the command queue.
+
+    python benchmarks/bench_vzduch.py [--latency SECONDS] [--failure-rate SHARE] [--polls N]
+"""
+import argparse
+import asyncio
+import time
+
+from common import load_vzduch, report, time_async, time_sync
+from vzduch_simulator import VzduchSimulator
+
+HOST = "127.0.0.1"
+PORT = 18899
+
+
+async def bench_polls(vzduch, args):
+    print(f"Poll latency ({args.zones} zones, {args.latency * 1000:.0f} ms server latency)")
+    simulator = VzduchSimulator(aircons=args.aircons, zones=args.zones, latency=args.latency)
+    await simulator.start(HOST, PORT)
+    client = vzduch.Vzduch(None, HOST, PORT, 10)
+    try:
+        await client.async_update()
+        report("poll, unchanged state", await time_async(args.polls, client.async_update))
+
+        sensor = simulator.state["aircons"][0]["zones"][0]["sensors"][0]
+
+        async def changing_poll():
+            sensor["temperature"] += 1
+            await client.async_update()
+
+        report("poll, changed state", await time_async(args.polls, changing_poll))
+
+        async def concurrent_polls():
+            await asyncio.gather(*[client.async_update() for _ in range(16)])
+
+        gets = simulator.gets
+        report("16 concurrent polls", await time_async(args.polls // 4, concurrent_polls))
+        print(f"{'':<36} {(simulator.gets - gets) / (args.polls // 4):.2f} GETs per 16 polls")
+    finally:
+        await client.close()
+        await simulator.stop()
+
+
+def bench_set_properties(vzduch, args):
+    print("set_properties against topology size")
+    for zones, sensors in ((4, 1), (8, 1), (16, 1), (16, 4), (64, 1), (64, 4)):
+        simulator = VzduchSimulator(aircons=args.aircons, zones=zones, sensors_per_zone=sensors)
+        first = simulator.payload()
+        simulator.state["aircons"][0]["roomTemperature"] += 1
+        second = simulator.payload()
+        client = vzduch.Vzduch(None, HOST, PORT, 10)
+        client.set_properties(first)
+        payloads = [first, second]
+
+        def parse():
+            payloads.reverse()
+            client.set_properties(payloads[0])
+
+        report(f"{args.aircons} ac x {zones} zones x {sensors} sensors", time_sync(args.parses, parse))
+
+        def parse_unchanged():
+            client.set_properties(payloads[0])
+
+        report(f"{'':<5}same bytes again", time_sync(args.parses, parse_unchanged))
+
+
+async def bench_commands(vzduch, args):
+    print(f"Command throughput ({args.commands} zone commands, {args.latency * 1000:.0f} ms server latency)")
+    simulator = VzduchSimulator(aircons=args.aircons, zones=args.zones, latency=args.latency)
+    await simulator.start(HOST, PORT)
+    client = vzduch.Vzduch(None, HOST, PORT, 10, command_window=args.window)
+    try:
+        await client.async_update()
+        aircon = client.aircon(0)
+        zone_ids = [zone.id for zone in aircon.zones]
+
+        posts = simulator.posts
+        start = time.perf_counter()
+        for index in range(args.commands):
+            await aircon.set_zone_damper(zone_ids[index % len(zone_ids)], index % 100)
+        elapsed = time.perf_counter() - start
+        print(f"{'sequential':<36} {args.commands / elapsed:8.1f} commands/s   {simulator.posts - posts} POSTs")
+
+        posts = simulator.posts
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            aircon.set_zone_damper(zone_ids[index % len(zone_ids)], (index + 1) % 100)
+            for index in range(args.commands)])
+        elapsed = time.perf_counter() - start
+        print(f"{'concurrent burst':<36} {args.commands / elapsed:8.1f} commands/s   {simulator.posts - posts} POSTs")
+
+        posts = simulator.posts
+        start = time.perf_counter()
+        await aircon.set_temperature(16)
+        await aircon.set_temperature(30)
+        elapsed = time.perf_counter() - start
+        print(f"{'set point 22 -> 16 -> 30':<36} {elapsed * 1000:8.1f} ms   {simulator.posts - posts} POSTs")
+    finally:
+        await client.close()
+        await simulator.stop()
+
+
+async def bench_failures(vzduch, args):
+    print(f"Polls under injected failures ({args.failure_rate:.0%} HTTP 500, {args.disconnect_rate:.0%} dropped)")
+    simulator = VzduchSimulator(aircons=args.aircons, zones=args.zones, latency=args.latency,
+                                failure_rate=args.failure_rate, disconnect_rate=args.disconnect_rate, seed=1)
+    await simulator.start(HOST, PORT)
+    client = vzduch.Vzduch(None, HOST, PORT, 2)
+    try:
+        available = 0
+
+        async def poll():
+            nonlocal available
+            await client.async_update()
+            available += client.available
+
+        report("poll with retries", await time_async(args.polls // 4, poll))
+        print(f"{'':<36} {available / (args.polls // 4):.0%} available, "
+              f"{simulator.requests} requests, {simulator.failures} injected failures")
+    finally:
+        await client.close()
+        await simulator.stop()
+
+
+async def main(args):
+    vzduch = load_vzduch()
+    await bench_polls(vzduch, args)
+    print()
+    bench_set_properties(vzduch, args)
+    print()
+    await bench_commands(vzduch, args)
+    if args.failure_rate or args.disconnect_rate:
+        print()
+        await bench_failures(vzduch, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--aircons", type=int, default=1)
+    parser.add_argument("--zones", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added by the simulator")
+    parser.add_argument("--polls", type=int, default=200)
+    parser.add_argument("--parses", type=int, default=500)
+    parser.add_argument("--commands", type=int, default=50)
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of requests answered with 500")
+    parser.add_argument("--disconnect-rate", type=float, default=0.0, help="share of requests dropped")
+    parser.add_argument("--window", type=float, default=0.01, help="command queue window in seconds")
+    asyncio.run(main(parser.parse_args()))
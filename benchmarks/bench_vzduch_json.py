@@ -0,0 +1,118 @@
+"""Microbenchmark of decoding Vzduch responses over synthetic multi-aircon payloads.
+
+Compares the stdlib json module with orjson (when installed), the cost of the old always
+evaluated debug f-string of the payload, and how long the event loop is blocked by a parse
+on the loop against one decoded in the executor.
+
+    python benchmarks/bench_vzduch_json.py [iterations]
+"""
+import asyncio
+import json
+import sys
+import time
+
+from common import load_vzduch, report, time_sync
+from vzduch_simulator import VzduchSimulator
+
+TOPOLOGIES = ((1, 8, 1), (2, 16, 2), (4, 32, 4), (4, 64, 4), (8, 128, 8))
+
+
+def payloads(aircons, zones, sensors):
+    """Two payloads of the same topology that differ, so the digest check never skips a parse"""
+    simulator = VzduchSimulator(aircons=aircons, zones=zones, sensors_per_zone=sensors)
+    first = simulator.payload()
+    simulator.state["aircons"][0]["roomTemperature"] += 1
+    return [first, simulator.payload()]
+
+
+def bench_decode(vzduch, count):
+    try:
+        import orjson
+    except ImportError:
+        orjson = None
+    print(f"Decode (backend in use: {vzduch.JSON_BACKEND})")
+    for topology in TOPOLOGIES:
+        payload = payloads(*topology)[0]
+        label = f"{topology[0]} ac x {topology[1]} zones x {topology[2]} sensors, {len(payload) // 1024} KiB"
+        print(label)
+        report("  json.loads", time_sync(count, lambda: json.loads(payload)))
+        if orjson is not None:
+            report("  orjson.loads", time_sync(count, lambda: orjson.loads(payload)))
+        data = json.loads(payload)
+        report("  f-string of payload (old debug log)", time_sync(count, lambda: f"[Vzduch] Loaded response {data}"))
+
+
+def bench_set_properties(vzduch, count):
+    print("set_properties, decode plus apply")
+    backends = [("json", json.loads)]
+    if vzduch.JSON_BACKEND != "json":
+        backends.append((vzduch.JSON_BACKEND, vzduch.json_loads))
+    default = vzduch.json_loads
+    for topology in TOPOLOGIES:
+        alternating = payloads(*topology)
+        print(f"{topology[0]} ac x {topology[1]} zones x {topology[2]} sensors")
+        for name, loads in backends:
+            vzduch.json_loads = loads
+            client = vzduch.Vzduch(None, "127.0.0.1", 0, 10)
+            client.set_properties(alternating[0])
+
+            def parse():
+                alternating.reverse()
+                client.set_properties(alternating[0])
+
+            report(f"  {name}", time_sync(count, parse))
+    vzduch.json_loads = default
+
+
+async def loop_block(vzduch, payload, threshold, count):
+    """Return the p95 and longest gap between event loop iterations while count responses are parsed"""
+    vzduch.DECODE_EXECUTOR_THRESHOLD = threshold
+    client = vzduch.Vzduch(None, "127.0.0.1", 0, 10)
+    alternating = [payload, payload.replace('"roomTemperature": 21', '"roomTemperature": 22', 1)]
+    gaps = []
+    done = False
+
+    async def ticker():
+        last = time.perf_counter()
+        while not done:
+            await asyncio.sleep(0)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+
+    task = asyncio.ensure_future(ticker())
+    await asyncio.sleep(0)
+    for _ in range(count):
+        alternating.reverse()
+        await client.async_set_properties(alternating[0])
+        await asyncio.sleep(0)
+    done = True
+    await task
+    gaps.sort()
+    return gaps[int(len(gaps) * 0.95)], gaps[-1]
+
+
+async def bench_loop_block(vzduch, count):
+    print("Event loop stalls while parsing, p95 / longest")
+    default = vzduch.DECODE_EXECUTOR_THRESHOLD
+    for topology in TOPOLOGIES:
+        payload = payloads(*topology)[0]
+        inline = await loop_block(vzduch, payload, float("inf"), count)
+        executor = await loop_block(vzduch, payload, 0, count)
+        print(f"{topology[0]} ac x {topology[1]} zones x {topology[2]} sensors, {len(payload) // 1024} KiB")
+        print(f"  decode on loop    {inline[0] * 1000:8.3f} / {inline[1] * 1000:8.3f} ms")
+        print(f"  decode in executor{executor[0] * 1000:8.3f} / {executor[1] * 1000:8.3f} ms")
+    vzduch.DECODE_EXECUTOR_THRESHOLD = default
+
+
+async def main(count):
+    vzduch = load_vzduch()
+    bench_decode(vzduch, count)
+    print()
+    bench_set_properties(vzduch, count)
+    print()
+    await bench_loop_block(vzduch, count // 4)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 400))
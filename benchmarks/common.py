@@ -0,0 +1,58 @@
+"""Helpers shared by the benchmark scripts."""
+import importlib.util
+import os
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+
+
+def load_module(name, path):
+    """Load a single module by path, without the Home Assistant package around it"""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, path))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_vzduch():
+    """Load airtouch3/vzduch.py"""
+    return load_module("vzduch", os.path.join("airtouch3", "vzduch.py"))
+
+
+def load_foobar2k():
+    """Load foobar2k/foobar2k.py"""
+    return load_module("foobar2k", os.path.join("foobar2k", "foobar2k.py"))
+
+
+async def time_async(count, call):
+    """Time count sequential awaits of call(), returning the samples in seconds"""
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        await call()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def time_sync(count, call):
+    """Time count sequential calls of call(), returning the samples in seconds"""
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def report(name, samples):
+    """Print mean, p50 and p95 of the samples in milliseconds"""
+    samples = sorted(samples)
+    print(f"{name:<36} mean {statistics.mean(samples) * 1000:8.3f} ms   "
+          f"p50 {samples[len(samples) // 2] * 1000:8.3f} ms   "
+          f"p95 {samples[int(len(samples) * 0.95)] * 1000:8.3f} ms")
@@ -0,0 +1,203 @@
+"""Local simulator of a Vzduch.Dotek Net server.
+
+Implements every endpoint used by airtouch3/vzduch.py with a configurable number of
+aircons, zones and sensors, injected latency and injected failures.
+
+    python benchmarks/vzduch_simulator.py --aircons 2 --zones 8 --latency 0.05
+"""
+import argparse
+import asyncio
+import json
+import random
+
+from aiohttp import web
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8899
+
+
+class VzduchSimulator:
+    """A Vzduch.Dotek Net server holding its state in memory.
+
+    latency is added to every request (plus up to jitter seconds). failure_rate is the share of
+    requests answered with HTTP 500, disconnect_rate the share dropped without a reply."""
+
+    def __init__(self, aircons=1, zones=8, sensors_per_zone=1, latency=0.0, jitter=0.0,
+                 failure_rate=0.0, disconnect_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.disconnect_rate = disconnect_rate
+        self.requests = 0
+        self.gets = 0
+        self.posts = 0
+        self.failures = 0
+        self._random = random.Random(seed)
+        self._runner = None
+        self.state = {"aircons": [self._aircon(ac_id, zones, sensors_per_zone) for ac_id in range(aircons)]}
+
+    @staticmethod
+    def _aircon(ac_id, zones, sensors_per_zone):
+        return {
+            "powerStatus": 1,
+            "name": f"AC {ac_id}",
+            "status": "OK",
+            "mode": 1,
+            "fanMode": 1,
+            "thermostatMode": 0,
+            "airTouchId": f"sim{ac_id}",
+            "touchPadTemperature": 21,
+            "roomTemperature": 21,
+            "desiredTemperature": 22,
+            "zones": [
+                {
+                    "id": zone_id,
+                    "name": f"Zone {zone_id}",
+                    "status": 1,
+                    "fanValue": 50,
+                    "isSpill": False,
+                    "desiredTemperature": 22,
+                    "zoneTemperatureType": 1,
+                    "sensors": [
+                        {
+                            "id": zone_id * sensors_per_zone + index,
+                            "isAvailable": True,
+                            "isLowBattery": False,
+                            "temperature": 21,
+                        }
+                        for index in range(sensors_per_zone)
+                    ],
+                }
+                for zone_id in range(zones)
+            ],
+        }
+
+    def payload(self):
+        """Return the body of GET /api/aircons"""
+        return json.dumps(self.state)
+
+    def app(self):
+        """Return the aiohttp application serving the simulator"""
+        app = web.Application(middlewares=[self._inject])
+        router = app.router
+        router.add_get("/api/aircons", self._get_aircons)
+        router.add_post("/api/aircons/{ac}/switch/{value}", self._ac_field("powerStatus"))
+        router.add_post("/api/aircons/{ac}/modes/{value}", self._ac_field("mode"))
+        router.add_post("/api/aircons/{ac}/fanmodes/{value}", self._ac_field("fanMode"))
+        router.add_post("/api/aircons/{ac}/temperature/{value}", self._ac_temperature)
+        router.add_post("/api/aircons/{ac}/zones/{zone}/temperature/{value}", self._zone_temperature)
+        router.add_post("/api/aircons/{ac}/zones/{zone}/toggle", self._zone_toggle)
+        router.add_post("/api/aircons/{ac}/zones/{zone}/switch/{value}", self._zone_field("status"))
+        router.add_post("/api/aircons/{ac}/zones/{zone}/damper/{value}", self._zone_field("fanValue"))
+        return app
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """Start serving on host:port"""
+        self._runner = web.AppRunner(self.app())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+
+    async def stop(self):
+        """Stop serving"""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    @web.middleware
+    async def _inject(self, request, handler):
+        self.requests += 1
+        delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            await asyncio.sleep(delay)
+        roll = self._random.random()
+        if roll < self.disconnect_rate:
+            self.failures += 1
+            request.transport.close()
+            raise asyncio.CancelledError()
+        if roll < self.disconnect_rate + self.failure_rate:
+            self.failures += 1
+            return web.Response(status=500, text="Simulated failure")
+        return await handler(request)
+
+    def _reply(self):
+        return web.Response(text=self.payload(), content_type="application/json")
+
+    def _find_aircon(self, request):
+        ac_id = int(request.match_info["ac"])
+        if ac_id >= len(self.state["aircons"]):
+            raise web.HTTPNotFound()
+        return self.state["aircons"][ac_id]
+
+    def _find_zone(self, request):
+        zone_id = int(request.match_info["zone"])
+        for zone in self._find_aircon(request)["zones"]:
+            if zone["id"] == zone_id:
+                return zone
+        raise web.HTTPNotFound()
+
+    async def _get_aircons(self, request):
+        self.gets += 1
+        return self._reply()
+
+    def _ac_field(self, key):
+        async def handler(request):
+            self.posts += 1
+            self._find_aircon(request)[key] = int(request.match_info["value"])
+            return self._reply()
+        return handler
+
+    async def _ac_temperature(self, request):
+        self.posts += 1
+        aircon = self._find_aircon(request)
+        aircon["desiredTemperature"] = min(32, max(16, aircon["desiredTemperature"] + int(request.match_info["value"])))
+        return self._reply()
+
+    async def _zone_temperature(self, request):
+        self.posts += 1
+        zone = self._find_zone(request)
+        if zone["desiredTemperature"]:
+            zone["desiredTemperature"] = min(32, max(16, zone["desiredTemperature"] + int(request.match_info["value"])))
+        return self._reply()
+
+    async def _zone_toggle(self, request):
+        self.posts += 1
+        zone = self._find_zone(request)
+        zone["status"] = 0 if zone["status"] else 1
+        return self._reply()
+
+    def _zone_field(self, key):
+        async def handler(request):
+            self.posts += 1
+            self._find_zone(request)[key] = int(request.match_info["value"])
+            return self._reply()
+        return handler
+
+
+async def _serve(args):
+    simulator = VzduchSimulator(
+        aircons=args.aircons, zones=args.zones, sensors_per_zone=args.sensors,
+        latency=args.latency, jitter=args.jitter,
+        failure_rate=args.failure_rate, disconnect_rate=args.disconnect_rate)
+    await simulator.start(args.host, args.port)
+    print(f"Vzduch simulator on http://{args.host}:{args.port}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await simulator.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--aircons", type=int, default=1)
+    parser.add_argument("--zones", type=int, default=8)
+    parser.add_argument("--sensors", type=int, default=1, help="sensors per zone")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="up to this many extra seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of requests answered with 500")
+    parser.add_argument("--disconnect-rate", type=float, default=0.0, help="share of requests dropped")
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
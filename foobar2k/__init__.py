@@ -2,6 +2,7 @@
 import asyncio
 import logging
 
+from aiohttp import ClientConnectionError
 from custom_components.foobar2k.foobar2k import Foobar2k
 import voluptuous as vol
 
@@ -47,6 +48,7 @@ async def async_setup_entry(hass: HomeAssistantType, entry: ConfigEntry):
         return False
 
     hass.data.setdefault(DOMAIN, {}).update({entry.entry_id: foobar2k_api})
+    foobar2k_api.start_stream()
     hass.async_create_task(hass.config_entries.async_forward_entry_setup(entry, PLATFORM))
 
     return True
@@ -54,7 +56,8 @@ async def async_setup_entry(hass: HomeAssistantType, entry: ConfigEntry):
 async def async_unload_entry(hass, config_entry):
     """Unload a config entry."""
     await asyncio.wait( [ hass.config_entries.async_forward_entry_unload(config_entry, PLATFORM)] )
-    hass.data[DOMAIN].pop(config_entry.entry_id)
+    foobar2k_api = hass.data[DOMAIN].pop(config_entry.entry_id)
+    await foobar2k_api.close()
 
     if not hass.data[DOMAIN]:
         hass.data.pop(DOMAIN)
@@ -64,20 +67,21 @@ async def async_unload_entry(hass, config_entry):
 async def api_init(hass, host, port, timeout = TIMEOUT):
     """Init the Foobar2k Server."""
 
-    session = hass.helpers.aiohttp_client.async_get_clientsession()
+    _LOGGER.debug(f"We have host {host} port {port}")
+    device = Foobar2k(None, host, port, timeout)
     try:
-        _LOGGER.debug(f"We have host {host} port {port}")
-        device = Foobar2k(session, host, port, timeout)
-
         await device.async_update()
     except asyncio.TimeoutError:
         _LOGGER.debug("Connection to %s timed out", host)
+        await device.close()
         raise ConfigEntryNotReady
     except ClientConnectionError:
         _LOGGER.debug("ClientConnectionError to %s", host)
+        await device.close()
         raise ConfigEntryNotReady
     except Exception:  # pylint: disable=broad-except
         _LOGGER.error("Unexpected error creating device %s", host)
+        await device.close()
         return None
 
     return device
@@ -5,7 +5,9 @@ import time
 import aiohttp
 import asyncio
 
+from collections import OrderedDict
 from datetime import timedelta
+from urllib.parse import quote
 from aiohttp import ClientSession, ServerDisconnectedError
 
 _LOGGER = logging.getLogger(__name__)
@@ -19,13 +21,43 @@ STATE_PLAYING = "playing"
 
 # Api calls
 GET_PLAYER_INFO = "/api/player"
+GET_PLAYER_INFO_PATH = "/api/player?columns=" + quote("%path%")
 GET_PLAYLIST_ITEMS = "/api/playlists/{0}/items/{1}"
 GET_PLAYLISTS = "/api/playlists"
 GET_ALBUM_ART = "/api/artwork/{0}/{1}"
+GET_UPDATES = "/api/query/updates"
+
+TRACK_COLUMNS = ["%artist%", "%title%", "%track%", "%album%", "%path%"]
+PATH_COLUMN = 4
+TRACK_CACHE_SIZE = 256
+# Items after the active one shown as up next, and fetched in the same request as the active
+# one. Fetching twice as many as are shown lets several track changes pass between fetches
+UP_NEXT_COUNT = 5
+PREFETCH_COUNT = 2 * UP_NEXT_COUNT
 
 HTTP_GET = "GET"
 HTTP_POST = "POST"
 
+# Keep-alive connections to the beefweb server
+POOL_CONNECTION_LIMIT = 4
+POOL_KEEPALIVE_TIMEOUT = 60
+POOL_DNS_CACHE_TTL = 300
+
+# Event stream. The stream is reopened when nothing arrives for STREAM_IDLE_TIMEOUT seconds,
+# and after a failure with a delay doubling from STREAM_RETRY_MIN up to STREAM_RETRY_MAX
+STREAM_IDLE_TIMEOUT = 300
+STREAM_RETRY_MIN = 1
+STREAM_RETRY_MAX = 60
+
+# Commands wait up to CONFIRM_TIMEOUT seconds for the player to show their effect. Without the
+# event stream the player is polled, first straight away and then after a delay doubling from
+# CONFIRM_POLL_DELAY
+CONFIRM_TIMEOUT = 2
+CONFIRM_POLL_DELAY = 0.05
+
+# A position sample further than this many seconds from the extrapolated position is a seek
+POSITION_DRIFT_THRESHOLD = 1.0
+
 POST_PLAYER = "/api/player"
 POST_PLAYER_PLAY = "/api/player/play"
 POST_PLAYER_STOP = "/api/player/stop"
@@ -58,7 +90,9 @@ class Foobar2k:
     """Api access to Foobar 2000 Server"""
 
     def __init__(self, session, host, port, timeout):
+        """When session is None the client creates and owns a keep-alive session for the host"""
         self._session = session
+        self._owns_session = False
         self._host = host
         self._port = port
         self._timeout = timeout
@@ -73,6 +107,7 @@ class Foobar2k:
         self._volume = 50
         self._track_duration = 0
         self._track_position = 0
+        self._position_at = time.monotonic()
         self._isMuted = False
         self._min_volume = -100
         self._album_art_url = None
@@ -82,12 +117,18 @@ class Foobar2k:
         self._playback_mode = PLAYBACK_MODE_DEFAULT
         self._path = None
         self._unique_id = f'{host.replace(".","_")}_{port}'
+        self._tracks = TrackCache()
+        self._item_counts = {}
+        self._listeners = []
+        self._stream_task = None
+        self._streaming = False
 
     async def fetch_get(self, command, data):
         """Send command via HTTP GET to Foobar2k server."""
         _LOGGER.debug("[Foobar2k] Running fetch GET")
         async with self._session.get("{base_url}{command}".format(
-            base_url=self._base_url, command=command), data=data) as resp_obj:
+            base_url=self._base_url, command=command), data=data,
+            timeout=aiohttp.ClientTimeout(total=self._timeout)) as resp_obj:
             response = await resp_obj.text()
             if (resp_obj.status == 200 or resp_obj.status == 204):
                 _LOGGER.debug("[Foobar2k] Have a response")
@@ -101,7 +142,8 @@ class Foobar2k:
         """Send command via HTTP POST to Foobar2k server."""
         _LOGGER.debug("[Foobar2k] Running fetch POST")
         async with self._session.post("{base_url}{command}".format(
-            base_url=self._base_url, command=command), data=data) as resp_obj:
+            base_url=self._base_url, command=command), data=data,
+            timeout=aiohttp.ClientTimeout(total=self._timeout)) as resp_obj:
             response = await resp_obj.text()
             if (resp_obj.status == 200 or resp_obj.status == 204):
                 _LOGGER.debug("[Foobar2k] Have a response")
@@ -115,23 +157,39 @@ class Foobar2k:
         """ Prepare the session and command"""
         _LOGGER.debug("[Foobar2k] Running prep_fetch")
         try:
-            if self._session and not self._session.closed:
-                if verb == HTTP_GET:
-                    return await self.fetch_get(command, data)
-                else:
-                    return await self.fetch_post(command, data)
-            async with aiohttp.ClientSession() as self._session:
-                if verb == HTTP_GET:
-                    return await self.fetch_get(command)
-                else:
-                    return await self.fetch_post(command, data)
+            if self._session is None or self._session.closed:
+                self._session = self.create_session()
+                self._owns_session = True
+            if verb == HTTP_GET:
+                return await self.fetch_get(command, data)
+            else:
+                return await self.fetch_post(command, data)
         except ValueError:
             pass
         except ServerDisconnectedError as error:
             _LOGGER.debug(f"[Foobar2k] Disconnected Error. Retry Count [{retries}]")
             if retries == 0:
                 raise error
-            return await self.prep_fetch(command, data, retries=retries - 1)
+            return await self.prep_fetch(verb, command, data, retries=retries - 1)
+
+    def create_session(self):
+        """Create a session keeping a few connections to the server alive"""
+        _LOGGER.debug(f"[Foobar2k] Creating connection pool for [{self._base_url}]")
+        connector = aiohttp.TCPConnector(
+            limit=POOL_CONNECTION_LIMIT,
+            limit_per_host=POOL_CONNECTION_LIMIT,
+            keepalive_timeout=POOL_KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=POOL_DNS_CACHE_TTL)
+        return aiohttp.ClientSession(connector=connector)
+
+    async def close(self):
+        """Stop the event stream and close the session if this client created it"""
+        await self.stop_stream()
+        if self._owns_session and self._session is not None and not self._session.closed:
+            _LOGGER.debug(f"[Foobar2k] Closing connection pool for [{self._base_url}]")
+            await self._session.close()
+        self._session = None
+        self._owns_session = False
 
     async def async_update(self, **kwargs):
         """Get the latest status information from Foobar2k server"""
@@ -139,12 +197,12 @@ class Foobar2k:
         _LOGGER.debug("[Foobar2k] Doing async_update")
         # Get current status of the FB2K server
         try:
-            response = await self.prep_fetch(HTTP_GET, GET_PLAYER_INFO)
+            response = await self.prep_fetch(HTTP_GET, GET_PLAYER_INFO_PATH)
             self._power = POWER_ON
             _LOGGER.debug("[Foobar2k] Doing update() POWER ON")
         except ValueError:
             pass
-        except requests.exceptions.RequestException:
+        except (requests.exceptions.RequestException, aiohttp.ClientError, asyncio.TimeoutError):
             # On timeout and connection error, the device is probably off
             self._power = POWER_OFF
             _LOGGER.debug("[Foobar2k] Doing update() POWER OFF")
@@ -164,45 +222,239 @@ class Foobar2k:
 
         data = json.loads(response)
         _LOGGER.debug(f"[Foobar2k] Set_properties Load response [{data}]")
-        new_state = data["player"]["playbackState"]
-        if (new_state != self._state):
+        if (data["player"]["playbackState"] != self._state):
             _LOGGER.debug("[Foobar2k] Getting playlists")
             await self.set_playlists()
-            
-        self._state = new_state
-        self._playback_mode = data["player"]["playbackMode"]
-
-        if 'activeItem' in data["player"]:
-            _LOGGER.debug("[Foobar2k] Set_properties Have activeItem")
-            if ('playlistId' in data["player"]["activeItem"]):
-                index = data["player"]["activeItem"]["index"]
-                if (index >= 0):
-                    _LOGGER.debug("[Foobar2k] Set_properties Have index")
-                    self._current_index = index
-                    self._current_playlist_id = data["player"]["activeItem"]["playlistId"]
-                    self._track_duration = data["player"]["activeItem"]["duration"]
-                    self._track_position = data["player"]["activeItem"]["position"]
-                    self._album_art_url = "{0}{1}".format(self._base_url, GET_ALBUM_ART.format(self._current_playlist_id, index))
-
-                    currently = await self.prep_fetch(HTTP_GET, GET_PLAYLIST_ITEMS.format(
-                        self._current_playlist_id, index), data='{"columns":["%artist%","%title%", "%track%", "%album%", "%path%"]}')
-                    if (currently is not None):
-                        _LOGGER.debug("[Foobar2k] Set_properties Have current song")
-                        i = json.loads(currently)
-                        _LOGGER.debug(f'Currently Playing [{i["playlistItems"]["items"][0]["columns"][0]}] [{i["playlistItems"]["items"][0]["columns"][1]}]')
-
-                        self._artist = i["playlistItems"]["items"][0]["columns"][0]
-                        self._title = i["playlistItems"]["items"][0]["columns"][1]
-                        self._album = i["playlistItems"]["items"][0]["columns"][3]
-                        self._path = i["playlistItems"]["items"][0]["columns"][4]
-
-        if 'volume' in data["player"]:
-            self._isMuted = data["player"]["volume"]["isMuted"]
-            self._volume = data["player"]["volume"]["value"]
-            self._min_volume = data["player"]["volume"]["min"]
+
+        if self.apply_player(data["player"]):
+            # The poll only asks for the path of the active item, the rest comes from the cache
+            path = (data["player"]["activeItem"].get("columns") or [None])[0]
+            columns = self._tracks.get(self._current_playlist_id, self._current_index, path)
+            if columns is None or not self.upcoming_cached():
+                currently = await self.fetch_tracks(self._current_playlist_id, self._current_index)
+                if columns is None:
+                    columns = currently
+            if columns is not None:
+                self.apply_columns(columns)
 
         _LOGGER.debug(f"[Foobar2k] Set_properties {self._artist} {self._title} {self._album} - {self._current_playlist_id}:{self._current_index}") 
 
+    def apply_player(self, player):
+        """Apply a player object from /api/player or the event stream.
+        Returns True when there is an active item"""
+        resync = player["playbackState"] != self._state
+        self._state = player["playbackState"]
+        self._playback_mode = player["playbackMode"]
+
+        active = False
+        if 'activeItem' in player and 'playlistId' in player["activeItem"]:
+            item = player["activeItem"]
+            if (item["index"] >= 0):
+                active = True
+                resync = resync or (item["playlistId"], item["index"]) != (self._current_playlist_id, self._current_index)
+                self._current_index = item["index"]
+                self._current_playlist_id = item["playlistId"]
+                self._track_duration = item["duration"]
+                self.sync_position(item["position"], resync)
+                self._album_art_url = "{0}{1}".format(self._base_url, GET_ALBUM_ART.format(self._current_playlist_id, self._current_index))
+
+        if 'volume' in player:
+            self._isMuted = player["volume"]["isMuted"]
+            self._volume = player["volume"]["value"]
+            self._min_volume = player["volume"]["min"]
+        return active
+
+    def sync_position(self, position, resync=False):
+        """Take a position sample as the new reference when resync is True or it drifted
+        more than POSITION_DRIFT_THRESHOLD from the extrapolated position.
+        Keeping the reference otherwise leaves track_position_at unchanged between polls"""
+        now = time.monotonic()
+        if resync or abs(self._extrapolate(now) - position) > POSITION_DRIFT_THRESHOLD:
+            _LOGGER.debug(f"[Foobar2k] Position resync to [{position}]")
+            self._track_position = position
+            self._position_at = now
+
+    def _extrapolate(self, now):
+        if self._state != STATE_PLAYING:
+            return self._track_position
+        position = self._track_position + now - self._position_at
+        return min(position, self._track_duration) if self._track_duration else position
+
+    def apply_columns(self, columns):
+        """Apply the TRACK_COLUMNS values of the active item"""
+        _LOGGER.debug(f"[Foobar2k] Currently Playing [{columns[0]}] [{columns[1]}]")
+        self._artist = columns[0]
+        self._title = columns[1]
+        self._album = columns[3]
+        self._path = columns[4]
+
+    async def fetch_tracks(self, playlist_id, index):
+        """Fetch the item at index and the PREFETCH_COUNT items after it in one ranged request
+        and cache them. Returns the columns of the item at index"""
+        response = await self.prep_fetch(HTTP_GET, GET_PLAYLIST_ITEMS.format(
+            playlist_id, f"{index}:{PREFETCH_COUNT + 1}"), data=json.dumps({"columns": TRACK_COLUMNS}))
+        if (response is None):
+            return None
+        items = json.loads(response)["playlistItems"]
+        self._item_counts[playlist_id] = items["totalCount"]
+        for offset, item in enumerate(items["items"]):
+            self._tracks.put(playlist_id, index + offset, item["columns"])
+        _LOGGER.debug(f"[Foobar2k] Fetched [{len(items['items'])}] items from [{playlist_id}:{index}]")
+        return items["items"][0]["columns"] if items["items"] else None
+
+    def upcoming(self):
+        """Return the indexes of the items that play after the active one.
+        Only known in the Default and Repeat Playlist modes"""
+        if self._state == STATE_STOPPED or self._playback_mode not in (PLAYBACK_MODE_DEFAULT, PLAYBACK_MODE_REPEAT_PLAYLIST):
+            return range(0)
+        end = self._current_index + 1 + UP_NEXT_COUNT
+        return range(self._current_index + 1, min(end, self._item_counts.get(self._current_playlist_id, end)))
+
+    def upcoming_cached(self):
+        """Return True if every upcoming item is in the cache"""
+        return all((self._current_playlist_id, index) in self._tracks for index in self.upcoming())
+
+    def apply_playlists(self, playlists):
+        """Apply a list of playlists from /api/playlists or the event stream"""
+        titles = {}
+        for pl in playlists:
+            titles[pl["title"]] = pl["id"]
+            if "itemCount" in pl:
+                self._item_counts[pl["id"]] = pl["itemCount"]
+            if (pl["isCurrent"]):
+                self._current_playlist_id = pl["id"]
+        self._playlists = titles
+
+    def apply_update(self, data):
+        """Apply one event from the stream. Each event only carries the sections that changed"""
+        if "playlists" in data:
+            # Items may have moved, so cached indexes can no longer be trusted
+            self._tracks.invalidate()
+            self.apply_playlists(data["playlists"])
+        if "player" in data:
+            if self.apply_player(data["player"]):
+                columns = data["player"]["activeItem"].get("columns")
+                if columns:
+                    self._tracks.put(self._current_playlist_id, self._current_index, columns)
+                    self.apply_columns(columns)
+
+    def add_listener(self, update_callback):
+        """Call update_callback after every applied stream event and when streaming starts or stops.
+        Returns a function removing the listener"""
+        self._listeners.append(update_callback)
+
+        def remove_listener():
+            self._listeners.remove(update_callback)
+
+        return remove_listener
+
+    def _notify(self):
+        for update_callback in list(self._listeners):
+            update_callback()
+
+    async def confirm(self, confirmed):
+        """Wait until confirmed() is True for the cached state, or CONFIRM_TIMEOUT passes.
+        Follows the event stream while it is up and polls the player otherwise.
+        Returns True if the change was seen"""
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + CONFIRM_TIMEOUT
+        delay = 0
+        while not confirmed():
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                _LOGGER.debug("[Foobar2k] Command not confirmed in time")
+                return False
+            if self._streaming:
+                # Any event, or the stream going down, resolves the waiter
+                waiter = loop.create_future()
+                remove_listener = self.add_listener(lambda: waiter.done() or waiter.set_result(None))
+                try:
+                    await asyncio.wait_for(waiter, remaining)
+                except asyncio.TimeoutError:
+                    pass
+                finally:
+                    remove_listener()
+            else:
+                await asyncio.sleep(min(delay, remaining))
+                await self.async_update()
+                delay = delay * 2 or CONFIRM_POLL_DELAY
+        return True
+
+    def _track_changed(self):
+        """Return a check for confirm that is True once another track, or the same one again, is playing"""
+        before = (self._current_playlist_id, self._current_index, self._state)
+        position = self._track_position
+        return lambda: (self._current_playlist_id, self._current_index, self._state) != before or self._track_position < position
+
+    def start_stream(self):
+        """Start following the beefweb event stream in the background"""
+        if self._stream_task is None:
+            self._stream_task = asyncio.ensure_future(self.async_stream())
+
+    async def stop_stream(self):
+        """Stop following the event stream"""
+        if self._stream_task is not None:
+            self._stream_task.cancel()
+            try:
+                await self._stream_task
+            except asyncio.CancelledError:
+                pass
+            self._stream_task = None
+        self._streaming = False
+
+    async def async_stream(self):
+        """Keep the event stream open, reopening it with backoff when it ends or fails.
+        While it is down, streaming is False and the owner polls with async_update"""
+        retry = STREAM_RETRY_MIN
+        while True:
+            delivered = False
+            try:
+                try:
+                    await self._read_stream()
+                finally:
+                    delivered = self._streaming
+                    if delivered:
+                        self._streaming = False
+                        self._notify()
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as error:
+                _LOGGER.debug(f"[Foobar2k] Event stream closed [{error!r}]")
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("[Foobar2k] Unexpected error following the event stream")
+            if delivered:
+                retry = STREAM_RETRY_MIN
+            _LOGGER.debug(f"[Foobar2k] Reopening event stream in [{retry}]s")
+            await asyncio.sleep(retry)
+            retry = min(retry * 2, STREAM_RETRY_MAX)
+
+    async def _read_stream(self):
+        if self._session is None or self._session.closed:
+            self._session = self.create_session()
+            self._owns_session = True
+
+        params = {"player": "true", "playlists": "true", "trcolumns": ",".join(TRACK_COLUMNS)}
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=self._timeout, sock_read=STREAM_IDLE_TIMEOUT)
+        _LOGGER.debug(f"[Foobar2k] Opening event stream at [{self._base_url}{GET_UPDATES}]")
+        async with self._session.get(f"{self._base_url}{GET_UPDATES}", params=params, timeout=timeout) as resp_obj:
+            resp_obj.raise_for_status()
+            pending = b""
+            event = []
+            async for chunk in resp_obj.content.iter_any():
+                *lines, pending = (pending + chunk).split(b"\n")
+                for line in lines:
+                    line = line.rstrip(b"\r")
+                    if line.startswith(b"data:"):
+                        event.append(line[5:])
+                    elif not line and event:
+                        self.apply_update(json.loads(b"\n".join(event)))
+                        event = []
+                        self._power = POWER_ON
+                        self._available = True
+                        self._streaming = True
+                        self._notify()
+                        if not self.upcoming_cached():
+                            await self.fetch_tracks(self._current_playlist_id, self._current_index)
+                            self._notify()
+
     @property
     def unique_id(self):
         """Return the unqiue id for this foobar server."""
@@ -276,14 +528,40 @@ class Foobar2k:
 
     @property
     def track_position(self):
-        """Playing position of the track"""
-        return self._track_position
+        """Playing position of the track, extrapolated from the last sample while playing"""
+        return self._extrapolate(time.monotonic())
+
+    @property
+    def track_position_at(self):
+        """Reference position of the track and the time.monotonic() it was sampled at"""
+        return self._track_position, self._position_at
 
     @property
     def track_duration(self):
         """Duration of the Track"""
         return self._track_duration
 
+    @property
+    def streaming(self):
+        """True while the event stream is delivering updates"""
+        return self._streaming
+
+    @property
+    def up_next(self):
+        """Artist and title of the cached upcoming items, in play order"""
+        up_next = []
+        for index in self.upcoming():
+            columns = self._tracks.peek(self._current_playlist_id, index)
+            if columns is None:
+                break
+            up_next.append(f"{columns[0]} - {columns[1]}")
+        return up_next
+
+    @property
+    def track_cache_stats(self):
+        """Return the track metadata cache counters"""
+        return self._tracks.stats
+
     @property
     def playlists(self):
         """ Get a list of all playlists """
@@ -353,17 +631,17 @@ class Foobar2k:
         """Send next command to FB2K Server"""
         _LOGGER.debug("[Foobar2k] In Next")
         if (self._power == POWER_ON):
-            await self.prep_fetch(HTTP_POST, POST_PLAYER_NEXT, data=None)
-            time.sleep(0.2)
-            await self.async_update()
+            changed = self._track_changed()
+            if (await self.prep_fetch(HTTP_POST, POST_PLAYER_NEXT, data=None) is not None):
+                await self.confirm(changed)
 
     async def play_previous(self):
         """Send previous command to FB2K Server"""
         _LOGGER.debug("[Foobar2k] In Previous")
         if (self._power == POWER_ON):
-            await self.prep_fetch(HTTP_POST, POST_PLAYER_PREVIOUS, data=None)
-            time.sleep(0.2)
-            await self.async_update()
+            changed = self._track_changed()
+            if (await self.prep_fetch(HTTP_POST, POST_PLAYER_PREVIOUS, data=None) is not None):
+                await self.confirm(changed)
 
     async def toggle_mute(self):
         """Mute the volume."""
@@ -392,28 +670,22 @@ class Foobar2k:
             data = json.dumps({"position": position})
             _LOGGER.debug(f"[Foobar2k] Position data [{data}]")
             await self.prep_fetch(HTTP_POST, POST_PLAYER, data=data)
-            self._track_position = position
+            self.sync_position(position, resync=True)
 
     async def set_playlists(self):
         """ Retrieve all available playlists from player"""
         _LOGGER.debug("[Foobar2k] Getting playlists")
         if (self._power == POWER_ON):
-            playlists = {}
             response = await self.prep_fetch(HTTP_GET, GET_PLAYLISTS, data=None)
             data = json.loads(response)
             _LOGGER.debug(f"[Foobar2k] Have playlists [{data}]")
-            for pl in data["playlists"]:
-                playlists[pl["title"]] = pl["id"]
-                if (pl["isCurrent"]):
-                    self._current_playlist_id = pl["id"]
-            self._playlists = playlists
+            self.apply_playlists(data["playlists"])
 
     async def set_playlist_play(self, playlist_id, index):
         """ Set the playlist and song index"""
-        await self.prep_fetch(HTTP_POST, POST_PLAYER_PLAY_PLAYLIST.format(playlist_id, index), data=None)
-        self._current_playlist_id = playlist_id
-        time.sleep(0.2)
-        await self.async_update()
+        if (await self.prep_fetch(HTTP_POST, POST_PLAYER_PLAY_PLAYLIST.format(playlist_id, index), data=None) is not None):
+            await self.confirm(lambda: self._state == STATE_PLAYING and
+                (self._current_playlist_id, self._current_index) == (playlist_id, index))
 
     async def set_playback_mode(self, new_mode):
         """Change the playback mode. Can be Default, Repeat (PlayList), Repeat (Track), Random, Shuffle (Tracks), Shuffle (Albums), Shuffle (Folders)"""
@@ -431,4 +703,59 @@ class Foobar2k:
             self._playback_mode = mode
 
     def get_playback_mode_description(self, mode):
-        return playback_modes[mode]
\ No newline at end of file
+        return playback_modes[mode]
+
+class TrackCache:
+    """Least recently used cache of TRACK_COLUMNS values keyed by (playlist id, index).
+
+    A caller that knows the path of the item passes it to get, and an entry for a different
+    path is treated as a miss, so an edited playlist is never served from the cache."""
+
+    def __init__(self, maxsize=TRACK_CACHE_SIZE):
+        self._maxsize = maxsize
+        self._items = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, playlist_id, index, path=None):
+        """Return the cached columns of the item, or None"""
+        key = (playlist_id, index)
+        columns = self._items.get(key)
+        if columns is None or (path is not None and columns[PATH_COLUMN] != path):
+            self._misses += 1
+            return None
+        self._items.move_to_end(key)
+        self._hits += 1
+        return columns
+
+    def peek(self, playlist_id, index):
+        """Return the cached columns of the item without counting a hit or miss, or None"""
+        return self._items.get((playlist_id, index))
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def put(self, playlist_id, index, columns):
+        """Cache the columns of the item, evicting the least recently used when full"""
+        key = (playlist_id, index)
+        self._items[key] = columns
+        self._items.move_to_end(key)
+        if len(self._items) > self._maxsize:
+            self._items.popitem(last=False)
+
+    def invalidate(self, playlist_id=None):
+        """Drop the items of one playlist, or of all playlists"""
+        if playlist_id is None:
+            self._items.clear()
+        else:
+            for key in [key for key in self._items if key[0] == playlist_id]:
+                del self._items[key]
+
+    @property
+    def stats(self):
+        """Return the cache counters"""
+        return {
+            "track_cache_hits": self._hits,
+            "track_cache_misses": self._misses,
+            "track_cache_size": len(self._items),
+        }
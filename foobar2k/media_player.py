@@ -2,6 +2,7 @@
 
 from collections import namedtuple
 import logging
+import time
 from datetime import timedelta
 
 import voluptuous as vol
@@ -24,6 +25,7 @@ from custom_components.foobar2k.foobar2k import (
     PLAYBACK_MODE_DEFAULT, PLAYBACK_MODE_REPEAT_PLAYLIST, PLAYBACK_MODE_REPEAT_TRACK, PLAYBACK_MODE_RANDOM,
     PLAYBACK_MODE_SHUFFLE_TRACKS, PLAYBACK_MODE_SHUFFLE_ALBUMS, PLAYBACK_MODE_SHUFFLE_FOLDERS)
 
+from homeassistant.core import callback
 import homeassistant.helpers.config_validation as cv
 import homeassistant.util.dt as dt_util
 
@@ -72,6 +74,7 @@ class Foobar2kDevice(MediaPlayerEntity):
         self._isMuted = False
         self._volume = 0
         self._track_position = None
+        self._position_sample = None
         self._track_duration = None
         self._shuffle = False
         self._current_playlist = None
@@ -79,15 +82,32 @@ class Foobar2kDevice(MediaPlayerEntity):
         self._media_path = None
         self._last_update = None
         self._playlists = []
+        self._up_next = []
         self._sound_mode_list = self._service.playback_modes
 
+    async def async_added_to_hass(self):
+        """Follow updates pushed from the beefweb event stream."""
+        self.async_on_remove(self._service.add_listener(self._handle_push))
+
+    @callback
+    def _handle_push(self):
+        """Apply the state pushed by the event stream."""
+        self._update_from_service()
+        self.async_write_ha_state()
+
     async def async_update(self):
-        await self._service.async_update()
+        # Polling stays scheduled so it can take over whenever the event stream is down
+        if not self._service.streaming:
+            await self._service.async_update()
+        self._update_from_service()
+
+    def _update_from_service(self):
         self._isMuted = self._service.isMuted
         self._volume = self._service.volume
         self._shuffle = self._service.isShuffle
         self._playlists = self._service.playlists
         self._current_playlist = self._service.current_playlist
+        self._up_next = self._service.up_next
         self._current_sound_mode = self._service.get_playback_mode_description(
             self._service.playback_mode)
         if (self.state == STATE_PLAYING):
@@ -96,9 +116,15 @@ class Foobar2kDevice(MediaPlayerEntity):
             self._artist = self._service.artist
             self._album = self._service.album
             self._media_path = self._service.media_path
-            self._track_position = self._service.track_position
             self._track_duration = self._service.track_duration
-            self._last_update = dt_util.utcnow()
+        if (self.state == STATE_PLAYING or self.state == STATE_PAUSED):
+            # The client only moves its reference position on a seek, pause, track change or drift,
+            # so the frontend keeps extrapolating from the same point between polls
+            position, sampled_at = self._service.track_position_at
+            if ((position, sampled_at) != self._position_sample):
+                self._position_sample = (position, sampled_at)
+                self._track_position = position
+                self._last_update = dt_util.utcnow() - timedelta(seconds=time.monotonic() - sampled_at)
 
     @property
     def unique_id(self) -> str:
@@ -218,6 +244,14 @@ class Foobar2kDevice(MediaPlayerEntity):
         else:
             return list(self._playlists.keys())
 
+    @property
+    def extra_state_attributes(self):
+        """Return the upcoming tracks and the track metadata cache counters."""
+        return {
+            "up_next": self._up_next,
+            **self._service.track_cache_stats,
+        }
+
     @property
     def sound_mode(self):
         return self._current_sound_mode
@@ -226,11 +260,6 @@ class Foobar2kDevice(MediaPlayerEntity):
     def sound_mode_list(self):
         return self._sound_mode_list
 
-    # @property
-    # def should_poll(self):
-    #     """Return True if entity has to be polled for state."""
-    #     return True
-
     async def async_media_play_pause(self):
         """Send the media player the command for play/pause."""
         _LOGGER.debug("[Media_Player_FB2K] Play / Pause Called")